@@ -1,12 +1,16 @@
-from pythonosc import dispatcher
-from pythonosc import osc_server
-import mne
-import tensorflow as tf
-import numpy as np
-import pandas as pd
 import multiprocessing
 from timeit import default_timer as timer
 import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Oracle-using MI imagery'))
+from ring_buffer import RingBuffer
+from shm_transport import SharedWindowRing
+from inference_scheduler import WindowScheduler
+from preprocessing import preprocess_window
+from inference_backend import KerasBackend
+from osc_ingest import OSCIngestServer
+from osc_fastpath import FastPathDispatcher
 
 ip = "0.0.0.0"
 port = 5000
@@ -16,42 +20,26 @@ n_channels = 4
 Wn = 1                                                                           #Prediction Window Duration
 Wn_overlap = 0.2                                                                 #Prediction Window Overlap
                                                                
-buffer_main = np.empty((0,n_channels))
-buffer_transfer = np.empty((0,n_channels))
+buffer_main = RingBuffer(Wn*Fs, n_channels)                                      #Preallocated circular buffer
 
 start = 0  
-recording = False
-lock = False 
+recording = False                                                                #Handlers all run on the one ingest thread, no lock needed
 
-queue = multiprocessing.Queue()
-wait = multiprocessing.Value('i',1)
+scheduler = WindowScheduler('latest_only')                                      #Hands window seqs to the inference process
+window_ring = None                                                               #Shared-memory window slots, created in __main__
  
    
-def convertDF2MNE(sub):
-    mne.set_log_level(verbose=False, return_old_level=False, add_frames=None)
-    info = mne.create_info(list(sub.columns), ch_types=['eeg'] * len(sub.columns), sfreq=Fs)
-    info.set_montage('standard_1020')
-    data=mne.io.RawArray(sub.T, info)
-    data.set_eeg_reference()
-    epochs=mne.make_fixed_length_epochs(data,duration=Wn)
-    return epochs.get_data()
-              
-
 def eeg_handler(address: str,*args):  
     global buffer_main
     global recording
-    global lock
     
     if recording:
-        buffer_main = np.append(buffer_main,[args[:4]],axis=0)
+        buffer_main.append(args[:4])
 
-    if buffer_main.shape[0]>=Wn*Fs and lock==False:
-        lock=True
-        buffer_transfer = buffer_main[:Wn*Fs]
-        buffer_main = buffer_main[int((Wn*(1-Wn_overlap*0.5)*Fs)):]
-        queue.put(buffer_transfer)
-        wait.value = 0 
-        lock=False
+    if len(buffer_main)>=Wn*Fs:
+        slot, seq = window_ring.write(buffer_main.window(Wn*Fs, copy=False))
+        buffer_main.consume(int((Wn*(1-Wn_overlap*0.5)*Fs)))
+        scheduler.publish(seq)
           
             
 def marker_handler(address: str,i):
@@ -71,44 +59,52 @@ def marker_handler(address: str,i):
         server.shutdown()
         print("Prediction Stopped")
  
-def Model_Run(test_model,queue,wait): 
-    
-    while wait.value!=0:
-        continue
+def Model_Run(test_model,window_ring,scheduler): 
     
-    np_array = queue.get() 
-    df = pd.DataFrame(np_array,columns=["TP9","AF7", "AF8","TP10"])             #Converting to Dataframe for MNE epoch
-    x_pred = convertDF2MNE(df)
-    x_pred = x_pred[:,:,:,np.newaxis]
-    y_pred = test_model.predict(x_pred)                                         #Predict
-    if y_pred[0][0]>y_pred[0][1]:
-        print('Predicted : Left with accuracy = {0:.3f}'.format(y_pred[0][0]))
-    else:
-        print('Predicted : Left with accuracy = {0:.3f}'.format(y_pred[0][1]))
-    sys.stdout.flush()
+    while True:
+        seq = scheduler.next()                                                  #Blocks until a window is published
+        if seq is None:                                                         #Scheduler closed
+            return
     
-    wait.value=1
-    Model_Run(test_model, queue, wait)
+        slot = seq % window_ring.n_slots
+        np_array = window_ring.read(slot, seq)                                  #Read in place from shared memory
+        if np_array is None:                                                    #Slot overwritten before we got to it
+            continue
+        x_pred = preprocess_window(np_array, Fs, Wn)                            #Average reference + epoch, same as MNE
+        if not window_ring.is_current(slot, seq):                               #Overwritten while being read
+            continue
+        y_pred = test_model.predict(x_pred)                                     #Predict
+        if y_pred[0][0]>y_pred[0][1]:
+            print('Predicted : Left with accuracy = {0:.3f}'.format(y_pred[0][0]))
+        else:
+            print('Predicted : Left with accuracy = {0:.3f}'.format(y_pred[0][1]))
+        sys.stdout.flush()
 
         
-def Inference(queue,wait):
+def Inference(window_ring,scheduler):
     
-    test_model = tf.keras.models.load_model('Models/EEG-ITNet/model.h5')
-    Model_Run(test_model, queue, wait)
+    test_model = KerasBackend('Models/EEG-ITNet/model.h5', n_channels, Wn*Fs)   #Traced forward pass, warmed up once
+    Model_Run(test_model, window_ring, scheduler)
     
 
 if __name__ == "__main__":
     
-    dispatcher = dispatcher.Dispatcher()
-    dispatcher.map("/muse/eeg", eeg_handler)
+    dispatcher = FastPathDispatcher()
+    dispatcher.map_samples("/muse/eeg", eeg_handler)                             #Decoded straight from the datagram
     dispatcher.map("/Marker/*", marker_handler)
     
-    inference = multiprocessing.Process(target=Inference, args=(queue,wait))
+    window_ring = SharedWindowRing(8, (Wn*Fs, n_channels))
+    inference = multiprocessing.Process(target=Inference, args=(window_ring,scheduler))
     inference.start()
     
-    server = osc_server.ThreadingOSCUDPServer((ip, port), dispatcher)
+    server = OSCIngestServer((ip, port), dispatcher)                             #One asyncio loop, datagrams handled in order
     print("Listening on UDP port "+str(port)+"\nSend Marker 1 to Start Predicting and Marker 2 to Stop Predicting.")
     server.serve_forever()
     
-    inference.terminate()
+    scheduler.close()
+    inference.join(timeout=2)
+    if inference.is_alive():
+        inference.terminate()
+        inference.join()
+    window_ring.close()
    
\ No newline at end of file
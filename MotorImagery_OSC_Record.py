@@ -2,24 +2,31 @@ from datetime import datetime
 from pythonosc import dispatcher
 from pythonosc import osc_server
 from timeit import default_timer as timer
-from playsound3 import playsound
+import threading
+import json
+import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Oracle-using MI imagery'))
+from binary_recording import BinaryRecorder
+from cue_scheduler import CueScheduler, CuePlayer
+from stream_monitor import StreamMonitor
+
 ip = "0.0.0.0"
 port = 5000
 filePath = 'Recordings/MotorImagery/'
 os.makedirs(filePath, exist_ok=True)
 recording = False
-initial_reading = 1
 row = 1
 current_file = ''
-current_event = 0
-start=timer()
-end=timer()
 secs = 10
-lock=False
+sample_count = 0
+segments = []               # {'label', 'time', 'start'}: first sample index of every segment
+segment_lock = threading.Lock()
+stream_monitor = StreamMonitor(256)     # effective rate, gaps and dropped packets
 header = 'timestamp,RAW_TP9,RAW_AF7,RAW_AF8,RAW_TP10\n'
 filename_array=[]
+record_format = 'csv'       # 'csv': one CSV per segment, 'binary': one float32 file per session (see binary_recording.py)
 
 rec_dict = {
     "Left"     : 20,
@@ -31,79 +38,83 @@ rec_dict = {
 #Initial Warmup
 dateTimeObj = datetime.now()
 timestampStr = dateTimeObj.strftime("%Y-%m-%d %H_%M_%S.%f")
+session_start = timestampStr
 ev = 'Warmup'
-current_file = filePath + ev + '.' + timestampStr + '.csv'
-f = open (current_file,'a+')
+segments.append({'label': ev, 'time': timestampStr, 'start': 0})
+if record_format == 'binary':
+    current_file = filePath + 'Session.' + timestampStr + '.bin'
+    f = BinaryRecorder(current_file, metadata={'rec_dict': rec_dict, 'warmup_secs': secs})
+    f.mark(ev, timestampStr)
+else:
+    current_file = filePath + ev + '.' + timestampStr + '.csv'
+    f = open (current_file,'a+')
+    f.write(header)
+
+
+def start_segment(ev, seg_secs):
+    """Called by the cue scheduler's timer thread at every segment boundary"""
+    global f, row, current_file, secs
+
+    dateTimeObj = datetime.now()
+    timestampStr = dateTimeObj.strftime("%Y-%m-%d %H_%M_%S.%f")
+    # Rotate under the lock so no sample lands in a half-switched file
+    with segment_lock:
+        segments.append({'label': ev, 'time': timestampStr, 'start': sample_count})
+        if record_format == 'binary':
+            f.mark(ev, timestampStr)
+        else:
+            f.close()
+            current_file = filePath + ev + '.' + timestampStr + '.csv'
+            filename_array.append(current_file)
+            f = open (current_file,'a+')
+            f.write(header)
+            row = 1
+    secs = seg_secs
+    print(f"Think:\t {ev}   \t\t{secs}  seconds")
+    print(f"Stream:\t {stream_monitor.summary()}")
 
 
 def eeg_handler(address: str,*args):
-    global recording
-    global initial_reading, row, header, current_event
-    global start,end,secs
-    global f, lock, filename_array
-    
+    global row, sample_count
     
     if recording:
-        
-        if initial_reading==1:
-            initial_reading = 0
-            start=timer()
-            f.write(header)
-            print(f"Warmup \t{secs}  seconds")
-            
-        else:
-            end=timer()
-            if (end - start) >= (secs) and lock==False:
-                lock=True
-                
-                f.close()
-                row=1
-                #start=timer()
-                
-                dateTimeObj = datetime.now()
-                timestampStr = dateTimeObj.strftime("%Y-%m-%d %H_%M_%S.%f")            
-                ev = list(rec_dict.items())[current_event][0]
-                secs = list(rec_dict.items())[current_event][1]
-                current_file = filePath + ev + '.' + timestampStr + '.csv'
-                filename_array.append(current_file)
-                f = open (current_file,'a+')
-                f.write(header)
-                playsound('Audio/{}.wav'.format(ev))
-                start=timer()
-                print(f"Think:\t {ev}   \t\t{secs}  seconds")
-                dict_length = len(rec_dict)                                 
-                if current_event < dict_length-1:                          
-                    current_event += 1
-                else:
-                    current_event = 0
-                    
-                lock=False
-                
+        with segment_lock:
+            stream_monitor.update(timer())
+            if record_format == 'binary':
+                f.append(args[:4])
             else:
-                if lock==False:
-                    fileString = str(row)
-                    row+=1
-                    for i in range(0,4):
-                        fileString += ","+str(args[i])            
-                    fileString+="\n"
-                    f.write(fileString)
+                fileString = str(row)
+                row+=1
+                for i in range(0,4):
+                    fileString += ","+str(args[i])            
+                fileString+="\n"
+                f.write(fileString)
+            sample_count += 1
 
-    
             
 def marker_handler(address: str,i):
     global recording
-    global start, current_event
     markerNum = address[-1]
     
     if (markerNum=="1"):        
         recording = True
-        start = timer()
+        stream_monitor.reset()
+        cue_scheduler.start()
         print("Recording Started.")
-        '''ev = list(rec_dict.items())[current_event][0]
-        print(f"Think:\t {ev}   \t\t{secs}  seconds")'''
+        print(f"Warmup \t{secs}  seconds")
     if (markerNum=="2"):
-        f.close()
-        recording = False
+        cue_scheduler.stop()
+        with segment_lock:
+            recording = False
+            if record_format == 'binary':
+                f.metadata['stream'] = stream_monitor.stats()
+            f.close()
+        if record_format == 'csv':
+            # Segment boundaries as sample indices into the concatenated session
+            with open(filePath + 'Session.' + session_start + '.segments.json', 'w') as seg_file:
+                json.dump({'rec_dict': rec_dict, 'segments': segments,
+                           'stream': stream_monitor.stats()}, seg_file, indent=2)
+        print(f"Stream:\t {stream_monitor.summary()}")
         server.shutdown()
         print("Recording Stopped.")    
 
@@ -112,6 +123,10 @@ if __name__ == "__main__":
     dispatcher.map("/muse/eeg", eeg_handler)
     dispatcher.map("/Marker/*", marker_handler)
 
+    # Segment switching runs on its own timer, cues are preloaded and non-blocking
+    cue_scheduler = CueScheduler(rec_dict, start_segment, warmup_secs=secs,
+                                 player=CuePlayer(rec_dict.keys(), 'Audio'))
+
     server = osc_server.ThreadingOSCUDPServer((ip, port), dispatcher)
     print("Listening on UDP port "+str(port)+"\nSend Marker 1 to Start recording and Marker 2 to Stop Recording.")
     server.serve_forever()
\ No newline at end of file
@@ -11,7 +11,6 @@
 
 # *******************  IMPORTING MODULES ********************
 
-from pythonosc.dispatcher import Dispatcher
 from pythonosc.osc_server import BlockingOSCUDPServer
 
 import threading
@@ -26,6 +25,10 @@ from pygame.locals import *
 from pygame_menu.examples import create_example_window
 import string
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Oracle-using MI imagery'))
+from osc_fastpath import FastPathDispatcher
 
 from pynput.keyboard import Key, Controller
 from timeit import default_timer as timer
@@ -140,7 +143,7 @@ def gamma_handler(address: str, *args):
 
 # ****************** OSC Dispatcher and Server ******************
 def get_dispatcher():
-    dispatcher = Dispatcher()
+    dispatcher = FastPathDispatcher()
     dispatcher.map("/muse/elements/blink", blink_handler)
     dispatcher.map("/muse/elements/jaw_clench", jaw_handler)
     dispatcher.map("/muse/elements/delta_absolute", delta_handler, 0)
@@ -148,8 +151,8 @@ def get_dispatcher():
     dispatcher.map("/muse/elements/alpha_absolute", alpha_handler, 2)
     dispatcher.map("/muse/elements/beta_absolute", beta_handler, 3)
     dispatcher.map("/muse/elements/gamma_absolute", gamma_handler, 4)
-    # Map the accelerometer OSC address to our new handler
-    dispatcher.map("/muse/acc", accel_handler)
+    # Map the accelerometer OSC address to our new handler, decoded straight from the datagram
+    dispatcher.map_samples("/muse/acc", accel_handler)
     return dispatcher
 
 def start_blocking_server(ip, port):
@@ -270,12 +273,29 @@ def show_image():
 
     screen = pygame.display.set_mode(size)
     pygame.display.update()
-    images = []
     path = 'Muse-EEG-main\Images/'
-    for image in os.listdir(path):
-        if image.startswith('0') and image.endswith('.png'):
-            images.append(image)
     img_w_def = 150
+    # Decode, scale and convert every image once; reload only when the folder changes
+    image_cache = {'mtime': None, 'checked': 0.0, 'thumbs': {}, 'larges': {}}
+    def load_images():
+        image_cache['mtime'] = os.stat(path).st_mtime
+        image_cache['checked'] = timer()
+        thumbs, larges = {}, {}
+        for name in os.listdir(path):
+            if name.startswith('0') and name.endswith('.png'):
+                image = pygame.image.load(path + name)
+                image = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+                IMAGE_SIZE = (img_w_def, img_w_def * image.get_height() / image.get_width())
+                thumbs[name] = pygame.transform.scale(image, IMAGE_SIZE)
+                larges[name] = pygame.transform.scale(image, (IMAGE_SIZE[0]*2.5, IMAGE_SIZE[1]*2.5))
+        image_cache['thumbs'], image_cache['larges'] = thumbs, larges
+        return list(thumbs)
+    def images_changed():
+        if timer() - image_cache['checked'] < 1:
+            return False
+        image_cache['checked'] = timer()
+        return os.stat(path).st_mtime != image_cache['mtime']
+    images = load_images()
     screen.fill(back_color)
     def writeLabels():
         write("Left",       HB_X +  40, scr_height/2+65, WHITE, 24)
@@ -321,25 +341,20 @@ def show_image():
         end = timer()
         if (end - start) > 0.1:
             start = timer()
+            if images_changed():
+                images = load_images()
+                nr_images = len(images)
             images = np.roll(images, state*-1)
             for i in range(nr_images):
-                image = pygame.image.load(path + images[i])
-                img_width   = image.get_width()
-                img_height  = image.get_height()
-                IMAGE_SIZE  = (img_w_def, img_w_def * img_height / img_width)
-                image       = pygame.transform.scale(image, IMAGE_SIZE)
+                image = image_cache['thumbs'][images[i]]
                 IMAGE_POSITION = ((i * (img_w_def + 20)) + 10, 290)
                 pygame.draw.rect(screen, back_color, (IMAGE_POSITION[0] + 20,
                     IMAGE_POSITION[1]+112, scr_width, 24))
                 write(images[i][4:-4], IMAGE_POSITION[0] + 20, IMAGE_POSITION[1]+112, WHITE, 24)
                 screen.blit(image, IMAGE_POSITION)
-                large_image = pygame.image.load(path + images[3])
-                img_width   = large_image.get_width()
-                img_height  = large_image.get_height()
-                IMAGE_SIZE  = (img_w_def*2.5, img_w_def*img_height/img_width*2.5)
-                large_image = pygame.transform.scale(large_image, IMAGE_SIZE)
-                IMAGE_POSITION = ((scr_width/2) - IMAGE_SIZE[0] / 2, 20)
-                screen.blit(large_image, IMAGE_POSITION)
+            large_image = image_cache['larges'][images[3]]
+            IMAGE_POSITION = ((scr_width/2) - large_image.get_width() / 2, 20)
+            screen.blit(large_image, IMAGE_POSITION)
         drawHealthMeterLeft(int(left * MAXHEALTH))
         drawHealthMeterBackground(int(background * MAXHEALTH))
         drawHealthMeterRight(int(right * MAXHEALTH))
@@ -0,0 +1,319 @@
+"""
+benchmarks.py - Offline micro-benchmarks for the prediction pipeline
+
+Runs every stage on synthetic 4-channel 256 Hz data, no headset needed:
+
+    eeg_handler       per-sample cost of PeriodicPredictor.eeg_handler
+    preprocess_*      window preprocessing, NumPy path and the MNE reference
+    forward_*         model forward pass on model.h5 (and a .tflite if given)
+    ipc_*             window round trip to another process, pickled through a
+                      multiprocessing.Queue vs. the shared-memory ring
+    ingest_*          /muse/eeg datagram to handler over loopback UDP, with
+                      ThreadingOSCUDPServer vs. the asyncio OSCIngestServer;
+                      cpu_us is the process CPU time per datagram
+    dispatch_*        decoding one /muse/eeg message or a 12-sample bundle,
+                      pythonosc's Dispatcher vs. FastPathDispatcher
+
+Results are written as JSON together with the git commit they were measured
+on, so two runs can be compared:
+
+    python benchmarks.py --out bench_a.json
+    python benchmarks.py --out bench_b.json --compare bench_a.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from timeit import default_timer as timer
+
+FS = 256
+N_CHANNELS = 4
+
+
+def _summary(durations):
+    """Statistics of a list of per-call durations in seconds"""
+    us = np.asarray(durations) * 1e6
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {'n': len(us), 'mean_us': float(us.mean()), 'p50_us': float(p50),
+            'p95_us': float(p95), 'p99_us': float(p99),
+            'per_second': float(1e6 / us.mean())}
+
+
+def _time_calls(fn, n, warmup=10):
+    for _ in range(warmup):
+        fn()
+    durations = np.empty(n)
+    for i in range(n):
+        t = timer()
+        fn()
+        durations[i] = timer() - t
+    return durations
+
+
+def _synthetic(n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(800, 50, size=(n_samples, N_CHANNELS))
+
+
+def bench_eeg_handler(n_samples):
+    from periodic_predictor import PeriodicPredictor
+
+    predictor = PeriodicPredictor(model_path=None, overload_policy='latest_only')
+    predictor.recording = True
+    samples = [tuple(s) for s in _synthetic(n_samples)]
+    durations = np.empty(n_samples)
+    for i, sample in enumerate(samples):
+        t = timer()
+        predictor.eeg_handler('/muse/eeg', *sample)
+        durations[i] = timer() - t
+    predictor.scheduler.close()
+    predictor.window_ring.close()
+    return {'eeg_handler': _summary(durations)}
+
+
+def bench_preprocess(n_windows):
+    from preprocessing import preprocess_window, mne_preprocess
+
+    window = _synthetic(FS)
+    results = {'preprocess_numpy': _summary(
+        _time_calls(lambda: preprocess_window(window, FS, 1), n_windows))}
+    try:
+        import mne  # noqa: F401
+    except ImportError:
+        print("mne not installed, skipping preprocess_mne")
+        return results
+    results['preprocess_mne'] = _summary(
+        _time_calls(lambda: mne_preprocess(window, FS, 1), max(10, n_windows // 10)))
+    return results
+
+
+def bench_forward(model_path, tflite_path, n_windows):
+    from preprocessing import preprocess_window
+
+    x = preprocess_window(_synthetic(FS), FS, 1).astype(np.float32)
+    results = {}
+    if model_path and os.path.exists(model_path):
+        from inference_backend import KerasBackend
+        backend = KerasBackend(model_path, N_CHANNELS, FS, verify=False)
+        results['forward_keras_predict'] = _summary(
+            _time_calls(lambda: backend.model.predict(x, verbose=0), max(10, n_windows // 10)))
+        results['forward_keras_traced'] = _summary(_time_calls(lambda: backend.predict(x), n_windows))
+    else:
+        print(f"No model at {model_path}, skipping forward_keras_*")
+    if tflite_path:
+        from tflite_backend import TFLiteBackend
+        backend = TFLiteBackend(tflite_path, N_CHANNELS, FS)
+        results['forward_tflite'] = _summary(_time_calls(lambda: backend.predict(x), n_windows))
+    return results
+
+
+def _echo_queue(inbox, outbox):
+    while True:
+        window = inbox.get()
+        if window is None:
+            break
+        outbox.put(float(window[0, 0]))
+
+
+def _echo_shm(window_ring, scheduler, outbox):
+    while True:
+        seq = scheduler.next()
+        if seq is None:
+            break
+        window = window_ring.read(seq % window_ring.n_slots, seq)
+        outbox.put(float(window[0, 0]))
+
+
+def bench_ipc(n_windows):
+    from shm_transport import SharedWindowRing
+    from inference_scheduler import WindowScheduler
+
+    window = _synthetic(FS)
+    results = {}
+
+    inbox, outbox = multiprocessing.Queue(), multiprocessing.Queue()
+    echo = multiprocessing.Process(target=_echo_queue, args=(inbox, outbox))
+    echo.start()
+
+    def queue_round_trip():
+        inbox.put(window)
+        outbox.get()
+    results['ipc_queue_pickle'] = _summary(_time_calls(queue_round_trip, n_windows))
+    inbox.put(None)
+    echo.join()
+
+    window_ring = SharedWindowRing(8, window.shape)
+    scheduler = WindowScheduler('queue')
+    outbox = multiprocessing.Queue()
+    echo = multiprocessing.Process(target=_echo_shm, args=(window_ring, scheduler, outbox))
+    echo.start()
+
+    def shm_round_trip():
+        _, seq = window_ring.write(window)
+        scheduler.publish(seq)
+        outbox.get()
+    results['ipc_shared_memory'] = _summary(_time_calls(shm_round_trip, n_windows))
+    scheduler.close()
+    echo.join()
+    window_ring.close()
+    return results
+
+
+def _ingest_run(server_class, n_datagrams, rate):
+    from pythonosc.dispatcher import Dispatcher
+    from pythonosc.udp_client import SimpleUDPClient
+
+    arrived = np.full(n_datagrams, np.nan)
+    done = threading.Event()
+
+    def handler(address, i, *args):
+        arrived[int(i)] = timer()
+        if int(i) == n_datagrams - 1:
+            done.set()
+
+    dispatcher = Dispatcher()
+    dispatcher.map('/muse/eeg', handler)
+    server = server_class(('127.0.0.1', 0), dispatcher)
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    client = SimpleUDPClient('127.0.0.1', port)
+    sample = [float(v) for v in _synthetic(1)[0]]
+    sent = np.empty(n_datagrams)
+    cpu = time.process_time()
+    start = timer()
+    for i in range(n_datagrams):
+        # Paced like a headset, so the comparison is about per-datagram cost
+        delay = start + i / rate - timer()
+        if delay > 0:
+            time.sleep(delay)
+        sent[i] = timer()
+        client.send_message('/muse/eeg', [i] + sample)
+    done.wait(timeout=5)
+    cpu = time.process_time() - cpu
+    server.shutdown()
+    thread.join()
+
+    received = ~np.isnan(arrived)
+    result = _summary((arrived - sent)[received])
+    # Includes the sender, which costs the same in both runs
+    result['cpu_us'] = float(cpu / n_datagrams * 1e6)
+    result['lost'] = int(n_datagrams - received.sum())
+    return result
+
+
+def bench_ingest(n_datagrams, rate=2048):
+    from pythonosc.osc_server import ThreadingOSCUDPServer
+    from osc_ingest import OSCIngestServer
+
+    return {'ingest_threading': _ingest_run(ThreadingOSCUDPServer, n_datagrams, rate),
+            'ingest_asyncio': _ingest_run(OSCIngestServer, n_datagrams, rate)}
+
+
+def bench_dispatch(n_packets):
+    from pythonosc.dispatcher import Dispatcher
+    from pythonosc.osc_message_builder import OscMessageBuilder
+    from pythonosc.osc_bundle_builder import OscBundleBuilder, IMMEDIATELY
+    from osc_fastpath import FastPathDispatcher
+
+    def message(sample):
+        builder = OscMessageBuilder('/muse/eeg')
+        for value in sample:
+            builder.add_arg(float(value), 'f')
+        return builder.build()
+
+    samples = _synthetic(12)
+    single = message(samples[0]).dgram
+    bundle = OscBundleBuilder(IMMEDIATELY)
+    for sample in samples:
+        bundle.add_content(message(sample))
+    bundle = bundle.build().dgram
+
+    def handler(address, *args):
+        pass
+
+    generic = Dispatcher()
+    generic.map('/muse/eeg', handler)
+    fast = FastPathDispatcher()
+    fast.map_samples('/muse/eeg', handler, handler)
+    return {
+        'dispatch_generic': _summary(_time_calls(lambda: generic.call_handlers_for_packet(single, None), n_packets)),
+        'dispatch_fastpath': _summary(_time_calls(lambda: fast.call_handlers_for_packet(single, None), n_packets)),
+        'dispatch_generic_x12': _summary(_time_calls(lambda: generic.call_handlers_for_packet(bundle, None), n_packets)),
+        'dispatch_fastpath_x12': _summary(_time_calls(lambda: fast.call_handlers_for_packet(bundle, None), n_packets)),
+    }
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+
+
+def print_results(results, baseline=None):
+    header = '{:<24}{:>8}{:>12}{:>12}{:>12}'.format('benchmark', 'n', 'p50 us', 'p95 us', 'p99 us')
+    if baseline:
+        header += '{:>12}'.format('p50 vs base')
+    print(header)
+    for name, row in results.items():
+        line = '{:<24}{n:>8}{p50_us:>12.2f}{p95_us:>12.2f}{p99_us:>12.2f}'.format(name, **row)
+        if baseline and name in baseline:
+            line += '{:>11.2f}x'.format(row['p50_us'] / baseline[name]['p50_us'])
+        if 'cpu_us' in row:
+            line += '   cpu {cpu_us:.1f} us, {lost} lost'.format(**row)
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--out', default='bench_output.json', help='JSON file to write')
+    parser.add_argument('--compare', help='earlier JSON result to compare against')
+    parser.add_argument('--model', default='Models/EEG-ITNet/model.h5')
+    parser.add_argument('--tflite', help='optional .tflite model to benchmark as well')
+    parser.add_argument('--samples', type=int, default=256 * 60, help='samples fed to eeg_handler')
+    parser.add_argument('--windows', type=int, default=500, help='calls per window benchmark')
+    parser.add_argument('--skip', nargs='*', default=[],
+                        choices=['eeg_handler', 'preprocess', 'forward', 'ipc', 'ingest', 'dispatch'])
+    args = parser.parse_args(argv)
+
+    results = {}
+    if 'eeg_handler' not in args.skip:
+        results.update(bench_eeg_handler(args.samples))
+    if 'preprocess' not in args.skip:
+        results.update(bench_preprocess(args.windows))
+    if 'forward' not in args.skip:
+        results.update(bench_forward(args.model, args.tflite, args.windows))
+    if 'ipc' not in args.skip:
+        results.update(bench_ipc(args.windows))
+    if 'ingest' not in args.skip:
+        results.update(bench_ingest(args.samples // 4))
+    if 'dispatch' not in args.skip:
+        results.update(bench_dispatch(args.samples))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    with open(args.out, 'w') as f:
+        json.dump({'meta': _metadata(), 'results': results}, f, indent=2)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+binary_recording.py - Buffered float32 recording of the EEG stream
+
+The CSV recorder formats every sample into a string and writes it from the
+OSC thread. BinaryRecorder instead copies samples into preallocated float32
+blocks; full blocks are handed to a writer thread, which appends them to a
+single file per session. The OSC thread never touches the disk.
+
+File layout:
+
+    [0, HEADER_SIZE)      b'OEEGREC1', uint32 header size, uint32 JSON length,
+                          JSON metadata padded with spaces
+    [HEADER_SIZE, ...)    float32 samples, (n_samples, n_channels), C order
+
+The metadata holds the channel names, sampling rate, the rec_dict schedule
+and the segments of the session (label, first sample index, wall-clock
+time). The header region has a fixed size, so it is rewritten in place on
+close without moving the data, and the samples can be memory-mapped with
+read_recording(). to_csv() writes the segments back out in the CSV layout of
+MotorImagery_OSC_Record.py.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import numpy as np
+
+MAGIC = b'OEEGREC1'
+HEADER_SIZE = 65536
+_PREFIX = struct.Struct('<8sII')
+
+CHANNELS = ['TP9', 'AF7', 'AF8', 'TP10']
+
+
+def _pack_header(metadata, header_size=HEADER_SIZE):
+    payload = json.dumps(metadata).encode('utf-8')
+    if _PREFIX.size + len(payload) > header_size:
+        raise ValueError(f"Recording metadata does not fit in the {header_size} byte header")
+    header = _PREFIX.pack(MAGIC, header_size, len(payload)) + payload
+    return header + b' ' * (header_size - len(header))
+
+
+class BinaryRecorder:
+    """Appends samples to preallocated float32 blocks flushed by a writer thread"""
+
+    def __init__(self, path, n_channels=4, fs=256, block_samples=256, n_blocks=8,
+                 channels=None, metadata=None):
+        self.path = path
+        self.n_channels = n_channels
+        self.block_samples = block_samples
+        self.metadata = {
+            'version': 1,
+            'fs': fs,
+            'channels': list(channels or CHANNELS[:n_channels]),
+            'dtype': 'float32',
+            'segments': [],
+        }
+        self.metadata.update(metadata or {})
+
+        self._file = open(path, 'wb')
+        self._file.write(_pack_header(self.metadata))
+
+        # Blocks circulate between the OSC thread and the writer thread
+        self._free = queue.Queue()
+        for _ in range(n_blocks - 1):
+            self._free.put(np.empty((block_samples, n_channels), dtype=np.float32))
+        self._block = np.empty((block_samples, n_channels), dtype=np.float32)
+        self._fill = 0
+        self._n_samples = 0
+
+        self._full = queue.Queue()
+        self._writer = threading.Thread(target=self._write_blocks, daemon=True)
+        self._writer.start()
+
+    def _write_blocks(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                break
+            block, n = item
+            self._file.write(block[:n].tobytes())
+            self._free.put(block)
+
+    def _hand_off(self):
+        self._full.put((self._block, self._fill))
+        try:
+            self._block = self._free.get_nowait()
+        except queue.Empty:
+            # Writer is behind; grow the pool rather than block the OSC thread
+            self._block = np.empty((self.block_samples, self.n_channels), dtype=np.float32)
+        self._fill = 0
+
+    @property
+    def n_samples(self):
+        """Samples appended so far, including those not yet on disk"""
+        return self._n_samples
+
+    def append(self, sample):
+        """Add one sample (n_channels values)"""
+        self._block[self._fill] = sample
+        self._fill += 1
+        self._n_samples += 1
+        if self._fill == self.block_samples:
+            self._hand_off()
+
+    def mark(self, label, time=None, **info):
+        """Start a new segment at the next sample"""
+        segment = {'label': label, 'start': self._n_samples, 'time': time}
+        segment.update(info)
+        self.metadata['segments'].append(segment)
+
+    def close(self):
+        """Write out the last partial block and the final metadata"""
+        if self._file.closed:
+            return
+        if self._fill:
+            self._hand_off()
+        self._full.put(None)
+        self._writer.join()
+        self.metadata['n_samples'] = self._n_samples
+        self._file.seek(0)
+        self._file.write(_pack_header(self.metadata))
+        self._file.close()
+
+
+def read_recording(path):
+    """(metadata, samples) with samples a read-only (n_samples, n_channels) memmap
+
+    The sample count comes from the file size, so a session cut short before
+    close() can still be read.
+    """
+    with open(path, 'rb') as f:
+        magic, header_size, length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary EEG recording")
+        metadata = json.loads(f.read(length))
+    n_channels = len(metadata['channels'])
+    n_samples = (os.path.getsize(path) - header_size) // (4 * n_channels)
+    if n_samples == 0:
+        return metadata, np.empty((0, n_channels), dtype=np.float32)
+    samples = np.memmap(path, dtype=np.float32, mode='r', offset=header_size,
+                        shape=(n_samples, n_channels))
+    return metadata, samples
+
+
+def segments(metadata, n_samples):
+    """[(label, time, start, end)] sample ranges of the session's segments"""
+    marks = metadata.get('segments', [])
+    bounds = [m['start'] for m in marks[1:]] + [n_samples]
+    return [(m['label'], m.get('time'), m['start'], end) for m, end in zip(marks, bounds)]
+
+
+def to_csv(path, out_dir):
+    """Write every segment as <label>.<time>.csv in the recorder's CSV layout
+
+    Samples were float32 on the wire, so the values come out exactly as the
+    CSV recorder prints them.
+    """
+    metadata, samples = read_recording(path)
+    os.makedirs(out_dir, exist_ok=True)
+    header = 'timestamp,' + ','.join('RAW_' + c for c in metadata['channels']) + '\n'
+    written = []
+    for label, time, start, end in segments(metadata, len(samples)):
+        csv_path = os.path.join(out_dir, f"{label}.{time}.csv")
+        with open(csv_path, 'w') as f:
+            f.write(header)
+            for row, sample in enumerate(samples[start:end].astype(np.float64).tolist(), 1):
+                f.write(str(row) + ',' + ','.join(map(str, sample)) + '\n')
+        written.append(csv_path)
+    return written
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python binary_recording.py <recording.bin> <csv output directory>")
+        sys.exit(1)
+    for csv_path in to_csv(sys.argv[1], sys.argv[2]):
+        print(csv_path)
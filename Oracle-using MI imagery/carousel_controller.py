@@ -16,6 +16,8 @@ from pynput.keyboard import Key, Controller
 import threading
 import time
 import webbrowser
+from image_cache import ImageCache
+from text_cache import TextCache
 
 class CarouselController:
     def __init__(self, predictor, screen_size=(1200, 768)):
@@ -35,6 +37,11 @@ class CarouselController:
         self.img_w_def = 150  # default image width
         self.MAXHEALTH = 9  # 0..9 = 10 bars for health bars
         
+        # Frame rate while something moves or changes, and while idle
+        self.active_fps = 120
+        self.idle_fps = 20
+        self._meter_levels = None  # health bar levels currently on screen
+        
         # Values for confidence visualization
         self.left = 0
         self.right = 0
@@ -48,6 +55,7 @@ class CarouselController:
         # Initialize pygame
         pygame.init()
         pygame.font.init()
+        self.text = TextCache()
         
     def init_menu(self):
         """Initialize the main menu"""
@@ -84,10 +92,9 @@ class CarouselController:
         pygame.display.update()
     
     def write(self, txt, x, y, color, size):
-        """Write text to the screen"""
-        font = pygame.font.SysFont(None, size)
-        img = font.render(txt, True, color)
-        self.screen.blit(img, (x, y))
+        """Write text to the screen; returns the rect it covers"""
+        img = self.text.render(txt, color, size)
+        return self.screen.blit(img, (x, y))
     
     def draw_health_meter_left(self, current_health):
         """Draw left health bar"""
@@ -108,6 +115,20 @@ class CarouselController:
             pygame.draw.rect(self.screen, self.WHITE, 
                              (HB_X + (10 * self.MAXHEALTH) - (i * 10), self.size[1] / 2 + 50, 20, HB_HEIGHT), 1)
     
+    def draw_health_meters(self):
+        """Redraw the three health bars if their levels changed; returns the dirty rect or None"""
+        levels = (int(self.left * self.MAXHEALTH), int(self.background * self.MAXHEALTH),
+                  int(self.right * self.MAXHEALTH))
+        if levels == self._meter_levels:
+            return None
+        self._meter_levels = levels
+        # The left bar clears the area of all three, so it goes first
+        self.draw_health_meter_left(levels[0])
+        self.draw_health_meter_background(levels[1])
+        self.draw_health_meter_right(levels[2])
+        HB_X = (self.size[0] / 2) - 185
+        return pygame.Rect(HB_X, self.size[1] / 2 + 50, 100 * self.MAXHEALTH, 11).clip(self.screen.get_rect())
+    
     def draw_health_meter_background(self, current_health):
         """Draw background health bar"""
         HB_X = (self.size[0] / 2) - 185
@@ -141,14 +162,15 @@ class CarouselController:
                              (HB_X+160 + (10 * self.MAXHEALTH) + i * 10, self.size[1] / 2 + 50, 20, HB_HEIGHT), 1)
     
     def write_alphabet(self, char_list):
-        """Write alphabet to screen"""
-        pygame.draw.rect(self.screen, self.back_color, 
-                         (0, self.size[1] / 2 + 100, self.size[0], 35))
+        """Write alphabet to screen; returns the rect it covers"""
+        area = pygame.draw.rect(self.screen, self.back_color, 
+                                (0, self.size[1] / 2 + 100, self.size[0], 35))
         
         i = 0
         for c in char_list:
-            self.write(c[0], 50 + (i*40), self.size[1]/2 + 100, self.WHITE, 60)
+            area.union_ip(self.write(c[0], 50 + (i*40), self.size[1]/2 + 100, self.WHITE, 60))
             i += 1
+        return area.clip(self.screen.get_rect())
     
     def open_application(self, app_code):
         """Open applications based on image code"""
@@ -215,7 +237,7 @@ class CarouselController:
     
     def text_editor(self):
         """Run the text editor interface"""
-        font = pygame.font.SysFont(None, 60)
+        font = self.text.font(60)
         
         # Drawing selector Rectangle
         pygame.draw.rect(self.screen, self.GREEN, pygame.Rect(
@@ -226,27 +248,29 @@ class CarouselController:
         # Text editor frame
         pygame.draw.rect(self.screen, self.WHITE, pygame.Rect(
             20, (self.size[1]/2) + 180, self.size[0]-40, 170), 1, 6)
+        pygame.display.update()
         
         text = ""
         img = font.render(text, True, self.WHITE)
         rect = img.get_rect()
+        text_area = pygame.Rect(0, self.size[1] / 2 + 180, self.size[0], 171)
         
+        clock = pygame.time.Clock()
         start = timer()
         editing = True
         
         print("Text editor opened")
         
         while editing:
+            dirty = []
+            
             # Check for exit event
             for event in pygame.event.get():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         editing = False
-            
-            # Update prediction confidence visuals
-            self.draw_health_meter_left(int(self.left * self.MAXHEALTH))
-            self.draw_health_meter_background(int(self.background * self.MAXHEALTH))
-            self.draw_health_meter_right(int(self.right * self.MAXHEALTH))
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    dirty.append(self.screen.get_rect())
             
             # Check EEG prediction
             prediction = self.predictor.get_next_prediction()
@@ -264,6 +288,11 @@ class CarouselController:
                     self.background = confidence
                     self.state = 0
             
+            # Update prediction confidence visuals
+            meters = self.draw_health_meters()
+            if meters:
+                dirty.append(meters)
+            
             # Check blink status
             blink_status = self.predictor.get_blink_status()
             blinked = blink_status['blinked']
@@ -277,12 +306,10 @@ class CarouselController:
                 start = timer()
                 if self.state == -1:
                     self.alphabet = np.roll(self.alphabet, 1, 0)
-                    self.write_alphabet(self.alphabet)
-                    pygame.display.update()  # Added display update
+                    dirty.append(self.write_alphabet(self.alphabet))
                 elif self.state == 1:
                     self.alphabet = np.roll(self.alphabet, -1, 0)
-                    self.write_alphabet(self.alphabet)
-                    pygame.display.update()  # Added display update
+                    dirty.append(self.write_alphabet(self.alphabet))
             
             # Handle blink selection
             if blinked:
@@ -292,28 +319,31 @@ class CarouselController:
                 if text == 'EDGE':
                     text += ' IMPULSE :-D'
                 img = font.render(text, True, self.WHITE)
-            
-            # Clear text area and redraw
-            pygame.draw.rect(self.screen, self.back_color, 
-                             (0, self.size[1] / 2 + 180, self.size[0]-40, 170))
-            pygame.draw.rect(self.screen, self.WHITE, pygame.Rect(
-                20, (self.size[1]/2) + 180, self.size[0]-40, 170), 1, 6)
-            
-            rect = img.get_rect()
-            rect.topleft = (40, 580)
-            self.screen.blit(img, rect)
-            pygame.display.update()
+                
+                # Clear text area and redraw
+                pygame.draw.rect(self.screen, self.back_color, 
+                                 (0, self.size[1] / 2 + 180, self.size[0]-40, 170))
+                pygame.draw.rect(self.screen, self.WHITE, pygame.Rect(
+                    20, (self.size[1]/2) + 180, self.size[0]-40, 170), 1, 6)
+                
+                rect = img.get_rect()
+                rect.topleft = (40, 580)
+                self.screen.blit(img, rect)
+                dirty.append(text_area.union(rect))
             
             # Exit on double blink
             if bl2:
                 print("Double blink detected - exiting text editor")
-                pygame.draw.rect(self.screen, self.back_color, 
-                                (0, (self.size[1]/2) + 88, self.size[0], self.size[1]))
-                pygame.display.update()
+                dirty.append(pygame.draw.rect(self.screen, self.back_color, 
+                                              (0, (self.size[1]/2) + 88, self.size[0], self.size[1])))
                 editing = False
             
-            # Add a small delay to avoid CPU hogging
-            pygame.time.delay(50)
+            if dirty:
+                pygame.display.update(dirty)
+            self.predictor.mark_rendered()
+            
+            # Full rate only while something changed on screen
+            clock.tick(self.active_fps if dirty or prediction else self.idle_fps)
         
         print("Text editor closed:", text)
         return text
@@ -323,12 +353,9 @@ class CarouselController:
         self.screen = pygame.display.set_mode(self.size)
         pygame.display.update()
         
-        # Find images
-        images = []
-        path = 'Images/'
-        for image in os.listdir(path):
-            if image.startswith('0') and image.endswith('.png'):
-                images.append(image)
+        # Decode and scale the carousel images once; redraws only blit
+        cache = ImageCache('Images/', self.img_w_def)
+        images = list(cache.names)
         
         # Set up display
         self.screen.fill(self.back_color)
@@ -343,19 +370,30 @@ class CarouselController:
         pygame.draw.rect(self.screen, self.GREEN, pygame.Rect(
             (self.size[0]/2)-(self.img_w_def/2)-15, (self.size[1]/2)-(self.img_w_def/2)-25,
             self.img_w_def + 20, self.img_w_def/1.3), 5, 7)
+        pygame.display.flip()
         
         clock = pygame.time.Clock()
         start = timer()
         nr_images = len(images)
         
+        # Only regions that changed are pushed to the display
+        self._meter_levels = None
+        redraw_images = True
+        chosen_shown = False
+        app_text_shown = False
+        
         # Start the image carousel loop
         running = True
         while running:
+            dirty = []
+            
             # Check for exit events
             for event in pygame.event.get():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    dirty.append(self.screen.get_rect())
             
             # Check EEG prediction
             prediction = self.predictor.get_next_prediction()
@@ -382,12 +420,14 @@ class CarouselController:
             if bl2:
                 if self.app_open:
                     self.app_open = self.close_application(self.app_type)
+                    app_text_shown = False
                 else:
                     running = False
             
             # Handle blink selection - open app or perform action
             if blinked:
-                self.write("Chosen", 20, 20, self.WHITE, 60)
+                dirty.append(self.write("Chosen", 20, 20, self.WHITE, 60))
+                chosen_shown = True
                 self.state = 0
                 
                 # Only proceed with opening apps if no app is currently open
@@ -413,63 +453,70 @@ class CarouselController:
                     elif self.app_type:  # If we successfully opened an app
                         self.app_open = True
                         self.app_open_time = timer()
-            else:
-                self.write("Chosen", 20, 20, self.back_color, 60)
+            elif chosen_shown:
+                dirty.append(self.write("Chosen", 20, 20, self.back_color, 60))
+                chosen_shown = False
             
             # Display app status if one is open
-            if self.app_open:
-                self.write("App Open - Double blink to close", 10, 50, self.GREEN, 30)
+            if self.app_open and not app_text_shown:
+                dirty.append(self.write("App Open - Double blink to close", 10, 50, self.GREEN, 30))
+                app_text_shown = True
                 
-            # Update image carousel
+            # Update image carousel; it only changes while rotating
             end = timer()
             if (end - start) > 0.1:
                 start = timer()
                 
-                # Rotate images based on state
-                images = np.roll(images, self.state*-1)
+                # Pick up images added to or removed from Images/
+                if cache.refresh():
+                    images = list(cache.names)
+                    nr_images = len(images)
+                    redraw_images = True
                 
-                # Display images
-                for i in range(nr_images):
-                    image_path = path + images[i]
-                    image = pygame.image.load(image_path)
-                    
-                    # Scale image
-                    img_width = image.get_width()
-                    img_height = image.get_height()
-                    IMAGE_SIZE = (self.img_w_def, self.img_w_def * img_height / img_width)
-                    image = pygame.transform.scale(image, IMAGE_SIZE)
+                if self.state != 0 or redraw_images:
+                    redraw_images = False
                     
-                    # Position image
-                    IMAGE_POSITION = ((i * (self.img_w_def + 20)) + 10, 290)
+                    # Rotate images based on state
+                    images = np.roll(images, self.state*-1)
                     
-                    # Clear description area
-                    pygame.draw.rect(self.screen, self.back_color, 
-                                     (IMAGE_POSITION[0] + 20, IMAGE_POSITION[1]+112, self.size[0], 24))
-                    
-                    # Write image description
-                    self.write(images[i][4:-4], IMAGE_POSITION[0] + 20,
-                               IMAGE_POSITION[1]+112, self.WHITE, 24)
-                    
-                    # Display image
-                    self.screen.blit(image, IMAGE_POSITION)
+                    # Display images
+                    carousel = []
+                    for i in range(nr_images):
+                        image = cache.thumb(images[i])
+                        
+                        # Position image
+                        IMAGE_POSITION = ((i * (self.img_w_def + 20)) + 10, 290)
+                        
+                        # Clear description area
+                        carousel.append(pygame.draw.rect(self.screen, self.back_color, 
+                                        (IMAGE_POSITION[0] + 20, IMAGE_POSITION[1]+112, self.size[0], 24)))
+                        
+                        # Write image description
+                        carousel.append(self.write(images[i][4:-4], IMAGE_POSITION[0] + 20,
+                                                   IMAGE_POSITION[1]+112, self.WHITE, 24))
+                        
+                        # Display image
+                        carousel.append(self.screen.blit(image, IMAGE_POSITION))
                     
                     # Enlarge center image
-                    large_image = pygame.image.load(path + images[3])
-                    img_width = large_image.get_width()
-                    img_height = large_image.get_height()
-                    IMAGE_SIZE = (self.img_w_def*2.5, self.img_w_def*img_height/img_width*2.5)
-                    large_image = pygame.transform.scale(large_image, IMAGE_SIZE)
-                    IMAGE_POSITION = ((self.size[0]/2) - IMAGE_SIZE[0] / 2, 20)
-                    self.screen.blit(large_image, IMAGE_POSITION)
+                    large_image = cache.large(images[3])
+                    IMAGE_POSITION = ((self.size[0]/2) - large_image.get_width() / 2, 20)
+                    carousel.append(self.screen.blit(large_image, IMAGE_POSITION))
+                    dirty.append(carousel[0].unionall(carousel[1:]).clip(self.screen.get_rect()))
             
             # Update health bars
-            self.draw_health_meter_left(int(self.left * self.MAXHEALTH))
-            self.draw_health_meter_background(int(self.background * self.MAXHEALTH))
-            self.draw_health_meter_right(int(self.right * self.MAXHEALTH))
+            meters = self.draw_health_meters()
+            if meters:
+                dirty.append(meters)
             
             # Update display
-            pygame.display.flip()
-            clock.tick(120)
+            if dirty:
+                pygame.display.update(dirty)
+            self.predictor.mark_rendered()
+            
+            # Full rate while the carousel rotates or anything changed, idle otherwise
+            animating = self.state != 0 or dirty or prediction or blinked
+            clock.tick(self.active_fps if animating else self.idle_fps)
     
     def start_the_game(self):
         """Start the game"""
@@ -0,0 +1,83 @@
+"""
+cue_scheduler.py - Runs the recording protocol on its own timer
+
+The recorder used to switch segments from inside eeg_handler, so a segment
+only ended when a sample happened to arrive, and the blocking playsound call
+stalled ingest for as long as the cue played. CueScheduler instead walks the
+rec_dict schedule on a timer thread against absolute deadlines (no drift),
+calls back into the recorder to rotate the output at each boundary and plays
+the cue asynchronously.
+
+Cue audio is preloaded with pygame.mixer; if the mixer is unavailable it
+falls back to playsound3 with block=False.
+"""
+
+import os
+import threading
+from timeit import default_timer as timer
+
+
+class CuePlayer:
+    """Preloaded, non-blocking playback of Audio/<label>.wav"""
+
+    def __init__(self, labels, audio_dir='Audio'):
+        self.paths = {label: os.path.join(audio_dir, f'{label}.wav') for label in labels}
+        self.sounds = {}
+        try:
+            import pygame
+            pygame.mixer.init()
+            for label, path in self.paths.items():
+                if os.path.exists(path):
+                    self.sounds[label] = pygame.mixer.Sound(path)
+        except Exception as e:
+            print(f"pygame.mixer unavailable ({e}), falling back to playsound3")
+            self.sounds = None
+
+    def play(self, label):
+        if self.sounds is not None:
+            sound = self.sounds.get(label)
+            if sound is not None:
+                sound.play()
+            return
+        path = self.paths.get(label)
+        if path and os.path.exists(path):
+            from playsound3 import playsound
+            playsound(path, block=False)
+
+
+class CueScheduler:
+    """Calls on_segment(label, secs) at every boundary of the rec_dict protocol
+
+    The first segment is the warmup; after it the rec_dict entries repeat in
+    order until stop(). on_segment runs on the timer thread and should only
+    rotate the output; the cue is played right after it returns.
+    """
+
+    def __init__(self, rec_dict, on_segment, warmup_secs=10, player=None):
+        self.schedule = list(rec_dict.items())
+        self.on_segment = on_segment
+        self.warmup_secs = warmup_secs
+        self.player = player
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        deadline = timer() + self.warmup_secs
+        current_event = 0
+        while not self._stop.wait(max(0.0, deadline - timer())):
+            ev, secs = self.schedule[current_event]
+            self.on_segment(ev, secs)
+            if self.player is not None:
+                self.player.play(ev)
+            deadline += secs
+            current_event = (current_event + 1) % len(self.schedule)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
@@ -0,0 +1,165 @@
+"""
+dataset_builder.py - Build the training set from recorded CSVs, in parallel and cached
+
+The notebook grows one DataFrame per class with DataFrame.append (quadratic,
+and gone in pandas 2) and the labels with np.append in a loop. build_dataset
+parses the recordings in a process pool, epochs each file with the vectorized
+NumPy path from preprocessing.py and stores the epochs of every file as a
+.npy in `cache_dir`, keyed by a hash of the file contents and the epoching
+parameters. A rebuild after a new session only parses the new files; the
+rest is memory-mapped from the cache. The combined dataset is one more .npy
+per source, labels and epoching setting; writing a new one removes the one
+it replaces, so the Train and Test sets of the notebook can share a cache.
+
+Each file is epoched on its own, so unlike the notebook no epoch spans the
+boundary between two recordings.
+
+    from dataset_builder import build_dataset
+    x, y, sessions = build_dataset('Recordings/MotorImagery', cache_dir='dataset_cache')
+"""
+
+import glob
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+import numpy as np
+from preprocessing import preprocess
+from streaming_filter import load_recording
+
+CACHE_VERSION = 1
+
+
+def label_of(path):
+    """'Left.2024-01-01 12_00_00.000000.csv' -> 'Left'"""
+    return os.path.basename(path).split('.')[0]
+
+
+def recorded_at(path):
+    """Time stamp in the recorder's file name, or None"""
+    stamp = os.path.basename(path)[len(label_of(path)) + 1:-len('.csv')]
+    try:
+        return datetime.strptime(stamp, "%Y-%m-%d %H_%M_%S.%f")
+    except ValueError:
+        return None
+
+
+def find_files(source, labels):
+    """Recordings of the given labels in a directory, a glob pattern or a list of paths"""
+    if isinstance(source, (list, tuple)):
+        paths = list(source)
+    elif os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.csv'))
+    else:
+        paths = glob.glob(source)
+    paths = [p for p in paths if label_of(p) in labels]
+    # Grouped by class like the notebook (all Left, then all Right)
+    return sorted(paths, key=lambda p: (labels.index(label_of(p)), os.path.basename(p)))
+
+
+def source_key(source, labels):
+    """Hash of where the recordings come from, not of which recordings are there now"""
+    if isinstance(source, (list, tuple)):
+        source = sorted({os.path.dirname(os.path.abspath(p)) for p in source})
+    else:
+        source = [os.path.abspath(source)]
+    return hashlib.sha1(repr((source, list(labels))).encode()).hexdigest()[:12]
+
+
+def session_ids(paths, session_gap=600):
+    """One session id per file: files recorded less than `session_gap` s apart share one
+
+    The recorder writes a file per segment, so a session is a run of files
+    whose time stamps follow each other closely. The id is the time stamp of
+    the first file in the run; files without one are a session of their own.
+    """
+    times = {p: recorded_at(p) for p in paths}
+    dated = sorted((t, p) for p, t in times.items() if t is not None)
+    ids = {p: os.path.basename(p) for p, t in times.items() if t is None}
+    current, previous = None, None
+    for t, p in dated:
+        if previous is None or (t - previous).total_seconds() > session_gap:
+            current = t.strftime("%Y-%m-%d %H_%M_%S")
+        ids[p] = current
+        previous = t
+    return [ids[p] for p in paths]
+
+
+def cache_key(path, fs, duration, overlap):
+    """Hash of the file contents and everything that changes its epochs"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    h.update(f"{CACHE_VERSION},{fs},{duration},{overlap}".encode())
+    return h.hexdigest()
+
+
+def epoch_file(path, fs=256, duration=1, overlap=0.2, out=None):
+    """(n_epochs, channels, window) epochs of one recording, optionally saved to `out`"""
+    epochs = preprocess(load_recording(path).to_numpy(), fs, duration, overlap)
+    epochs = np.ascontiguousarray(epochs)
+    if out is not None:
+        tmp = out + '.tmp.npy'
+        np.save(tmp, epochs)
+        os.replace(tmp, out)
+    return epochs
+
+
+def build_dataset(source, labels=('Left', 'Right'), fs=256, duration=1, overlap=0.2,
+                  cache_dir=None, n_jobs=None, session_gap=600):
+    """Epochs, labels and session ids of every recording in `source`
+
+    Returns (x, y, sessions): x is (n_epochs, channels, window), y the index
+    of each epoch's label in `labels` and sessions the session id of the file
+    it came from (see session_ids). With a cache_dir, x is a read-only
+    memmap of the cached dataset.
+    """
+    labels = list(labels)
+    paths = find_files(source, labels)
+    if not paths:
+        raise FileNotFoundError(f"No {'/'.join(labels)} recordings found in {source}")
+
+    if cache_dir is None:
+        with ProcessPoolExecutor(n_jobs) as pool:
+            parts = list(pool.map(epoch_file, paths, repeat(fs), repeat(duration), repeat(overlap)))
+        combined = None
+    else:
+        os.makedirs(cache_dir, exist_ok=True)
+        with ProcessPoolExecutor(n_jobs) as pool:
+            keys = list(pool.map(cache_key, paths, repeat(fs), repeat(duration), repeat(overlap)))
+            cached = [os.path.join(cache_dir, key + '.npy') for key in keys]
+            missing = [(p, c) for p, c in zip(paths, cached) if not os.path.exists(c)]
+            if missing:
+                print(f"Epoching {len(missing)} new recording(s), {len(paths) - len(missing)} cached")
+                new_paths, new_cached = zip(*missing)
+                list(pool.map(epoch_file, new_paths, repeat(fs), repeat(duration), repeat(overlap),
+                              new_cached))
+        parts = [np.load(c, mmap_mode='r') for c in cached]
+        prefix = os.path.join(cache_dir, f'dataset-{source_key(source, labels)}-{fs}-{duration}-{overlap}-')
+        combined = prefix + hashlib.sha1(''.join(keys).encode()).hexdigest() + '.npy'
+
+    counts = [len(part) for part in parts]
+    y = np.repeat([labels.index(label_of(p)) for p in paths], counts).astype(np.float64)
+    sessions = np.repeat(session_ids(paths, session_gap), counts)
+
+    if combined is None:
+        return np.concatenate(parts, axis=0), y, sessions
+    if not os.path.exists(combined):
+        x = np.lib.format.open_memmap(combined + '.tmp.npy', mode='w+', dtype=parts[0].dtype,
+                                      shape=(sum(counts),) + parts[0].shape[1:])
+        np.concatenate(parts, axis=0, out=x)
+        x.flush()
+        del x
+        os.replace(combined + '.tmp.npy', combined)
+        # Older file sets of the same source and epoching; other datasets may still
+        # be in use (Train and Test, sweeps)
+        for stale in glob.glob(glob.escape(prefix) + '*.npy'):
+            if stale != combined:
+                try:
+                    os.remove(stale)
+                except PermissionError:
+                    pass        # still memory-mapped on Windows; goes on the next build
+
+    return np.load(combined, mmap_mode='r'), y, sessions
@@ -0,0 +1,72 @@
+"""
+eeg_itnet.py - EEG-ITNet model definition
+
+The Network from the training notebook, with its hyperparameters as
+arguments instead of notebook globals so training scripts and sweeps can
+build variants. Layers are created in the same order as in the notebook, so
+weights saved from either load into the other.
+
+EEG-ITNet: four inception branches of spectral (temporal) convolutions with
+depthwise spatial filters, followed by a dilated temporal convolution stack
+with residual connections.
+"""
+
+import tensorflow as tf
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import Input, Dense, Activation, Dropout, BatchNormalization, Flatten
+from tensorflow.keras.layers import Concatenate, AveragePooling2D, Conv2D, DepthwiseConv2D, Add
+from tensorflow.keras.constraints import max_norm
+
+N_FF = (2, 4, 8, 16)      # Number of frequency filters for each inception module
+N_SF = (1, 1, 1, 1)       # Number of spatial filters in each frequency sub-band
+KERNELS = (16, 32, 64, 128)
+DILATIONS = (1, 2, 4, 8)
+
+
+def _inception_branch(Input_block, Chans, index, n_ff, n_sf, kernel):
+    block = Conv2D(n_ff, (1, kernel), use_bias = False, activation = 'linear', padding='same',
+                   name = f'Spectral_filter_{index}')(Input_block)
+    block = BatchNormalization()(block)
+    block = DepthwiseConv2D((Chans, 1), use_bias = False, padding='valid', depth_multiplier = n_sf,
+                            activation = 'linear', depthwise_constraint = tf.keras.constraints.MaxNorm(max_value=1),
+                            name = f'Spatial_filter_{index}')(block)
+    block = BatchNormalization()(block)
+    return Activation('elu')(block)
+
+
+def _residual_block(block_in, dilation, drop_rate):
+    # Causal padding: (kernel 4 - 1) * dilation zeros in front of the time axis
+    paddings = tf.constant([[0,0], [0,0], [3 * dilation,0], [0,0]])
+    block = block_in
+    for _ in range(2):
+        block = tf.pad(block, paddings, "CONSTANT")
+        block = DepthwiseConv2D((1,4), padding="valid", depth_multiplier=1, dilation_rate=(1, dilation))(block)
+        block = BatchNormalization()(block)
+        block = Activation('elu')(block)
+        block = Dropout(drop_rate)(block)
+    return Add()([block_in, block])
+
+
+def Network(Chans, Samples, out_type = 'single', n_ff=N_FF, n_sf=N_SF, drop_rate=0.2, out_class=2):
+    Input_block = Input(shape = (Chans, Samples, 1))
+
+    branches = [_inception_branch(Input_block, Chans, i + 1, n_ff[i], n_sf[i], KERNELS[i])
+                for i in range(len(KERNELS))]
+    block = Concatenate(axis = -1)(branches)
+
+    block = AveragePooling2D((1, 4))(block)
+    block_out = Dropout(drop_rate)(block)
+
+    for dilation in DILATIONS:
+        block_out = _residual_block(block_out, dilation, drop_rate)
+
+    block = Conv2D(28, (1,1))(block_out)
+    block = BatchNormalization()(block)
+    block = Activation('elu')(block)
+    block = AveragePooling2D((1,4), data_format='Channels_last')(block) #'Channels_last' As CPU will be used for inference
+    block = Dropout(drop_rate)(block)
+    embedded = Flatten()(block)
+
+    out = Dense(out_class, activation = 'softmax', kernel_constraint = max_norm(0.2))(embedded)
+
+    return Model(inputs = Input_block, outputs = out)
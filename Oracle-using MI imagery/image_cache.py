@@ -0,0 +1,72 @@
+"""
+image_cache.py - Decoded, pre-scaled carousel images
+
+The carousel redraws every 100 ms, and used to load and scale every PNG in
+Images/ from disk each time, reloading the large centre image once per
+thumbnail as well. ImageCache decodes each image once, scales it to the
+thumbnail width and to the enlarged centre size, and converts both to the
+display's pixel format, so that a redraw is only blits. Images are reloaded
+when the directory's modification time changes, which is checked at most
+every `check_interval` seconds.
+
+Surfaces are converted for the current display, so create the cache after
+pygame.display.set_mode().
+"""
+
+import os
+import pygame
+from timeit import default_timer as timer
+
+
+class ImageCache:
+    """Thumbnail and large surfaces of the carousel images in `path`"""
+
+    def __init__(self, path='Images/', thumb_width=150, large_scale=2.5, prefix='0',
+                 suffix='.png', check_interval=1.0):
+        self.path = path
+        self.thumb_width = thumb_width
+        self.large_scale = large_scale
+        self.prefix, self.suffix = prefix, suffix
+        self.check_interval = check_interval
+        self.names = []
+        self.thumbs = {}
+        self.larges = {}
+        self.version = 0            # incremented on every reload
+        self._mtime = None
+        self._checked = 0.0
+        self.load()
+
+    def load(self):
+        """Decode, scale and convert every carousel image in `path`"""
+        self._mtime = os.stat(self.path).st_mtime
+        self._checked = timer()
+        names = [name for name in os.listdir(self.path)
+                 if name.startswith(self.prefix) and name.endswith(self.suffix)]
+        thumbs, larges = {}, {}
+        for name in names:
+            image = pygame.image.load(os.path.join(self.path, name))
+            # Keep transparency only for images that have it; opaque blits are faster
+            image = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+            height = self.thumb_width * image.get_height() / image.get_width()
+            thumbs[name] = pygame.transform.scale(image, (self.thumb_width, height))
+            larges[name] = pygame.transform.scale(
+                image, (self.thumb_width * self.large_scale, height * self.large_scale))
+        self.names, self.thumbs, self.larges = names, thumbs, larges
+        self.version += 1
+
+    def refresh(self):
+        """Reload if Images/ changed; returns True when it did"""
+        now = timer()
+        if now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        if os.stat(self.path).st_mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+    def thumb(self, name):
+        return self.thumbs[name]
+
+    def large(self, name):
+        return self.larges[name]
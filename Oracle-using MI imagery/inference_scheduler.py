@@ -0,0 +1,97 @@
+"""
+inference_scheduler.py - Blocking hand-off of window sequence numbers to the inference process
+
+The OSC process publishes the sequence number of every window it writes to the
+SharedWindowRing; the inference process blocks on a multiprocessing.Condition
+until there is something to do, so an idle worker uses no CPU.
+
+When predictions are slower than windows arrive, the overload policy decides
+which pending windows are still worth predicting:
+
+    'queue'        every window, oldest first (bounded only by the ring size)
+    'drop_oldest'  keep at most `max_depth` pending windows, skip older ones
+    'latest_only'  always jump to the newest window
+"""
+
+import multiprocessing
+
+POLICIES = ('queue', 'drop_oldest', 'latest_only')
+
+
+class WindowScheduler:
+    """Single-producer, single-consumer window scheduler shared across processes"""
+
+    def __init__(self, policy='latest_only', max_depth=4):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overload policy '{policy}', expected one of {POLICIES}")
+        self.policy = policy
+        self.max_depth = max(1, int(max_depth))
+
+        self._cond = multiprocessing.Condition()
+        # All counters are only touched while holding self._cond
+        self._published = multiprocessing.Value('q', 0, lock=False)   # next seq to be published
+        self._consumed = multiprocessing.Value('q', 0, lock=False)    # next seq to hand out
+        self._dropped = multiprocessing.Value('q', 0, lock=False)
+        self._closed = multiprocessing.Value('b', 0, lock=False)
+
+    def publish(self, seq):
+        """Announce that window `seq` has been written (producer side)"""
+        with self._cond:
+            self._published.value = seq + 1
+            self._cond.notify()
+
+    def _skip(self, depth):
+        """Number of pending windows the overload policy discards"""
+        if self.policy == 'latest_only':
+            return depth - 1
+        if self.policy == 'drop_oldest':
+            return max(0, depth - self.max_depth)
+        return 0
+
+    def next(self, timeout=None):
+        """Block until a window is pending and return its seq (consumer side)
+
+        Returns None on timeout or once the scheduler has been closed.
+        """
+        batch = self.next_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def next_batch(self, max_batch, timeout=None):
+        """Block until windows are pending and return up to `max_batch` seqs, oldest first
+
+        The overload policy is applied first, so with 'latest_only' the batch
+        always holds a single window. Returns an empty list on timeout or once
+        the scheduler has been closed.
+        """
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._closed.value or self._published.value > self._consumed.value,
+                timeout)
+            if not ready or self._closed.value:
+                return []
+            skip = self._skip(self._published.value - self._consumed.value)
+            self._dropped.value += skip
+            first = self._consumed.value + skip
+            count = min(max(1, max_batch), self._published.value - first)
+            self._consumed.value = first + count
+            return list(range(first, first + count))
+
+    def depth(self):
+        """Number of windows published but not yet handed out"""
+        with self._cond:
+            return self._published.value - self._consumed.value
+
+    def stats(self):
+        with self._cond:
+            return {
+                'policy': self.policy,
+                'published': self._published.value,
+                'depth': self._published.value - self._consumed.value,
+                'dropped': self._dropped.value,
+            }
+
+    def close(self):
+        """Wake the consumer and make every further `next` return None"""
+        with self._cond:
+            self._closed.value = 1
+            self._cond.notify_all()
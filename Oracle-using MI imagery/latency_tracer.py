@@ -0,0 +1,78 @@
+"""
+latency_tracer.py - Per-stage latency of every window, from OSC packet to carousel frame
+
+Each prediction carries a dict of timestamps (default_timer, which is a
+system-wide monotonic clock, so stamps from the OSC thread, the inference
+process and the UI loop are comparable):
+
+    first_sample   arrival of the oldest sample in the window (eeg_handler)
+    last_sample    arrival of the sample that completed the window
+    enqueue        window written to shared memory and published
+    dequeue        window handed to the inference worker
+    preprocessed   preprocessing of the worker's batch done
+    predicted      forward pass done
+    consumed       result taken by get_next_prediction
+    rendered       first carousel frame drawn after that
+
+LatencyTracer turns them into stage durations and keeps the most recent
+`history` values of each stage for rolling p50/p95/p99.
+"""
+
+import json
+import threading
+from collections import deque
+import numpy as np
+
+# (stage, from stamp, to stamp)
+STAGES = [
+    ('window_fill', 'first_sample', 'last_sample'),
+    ('enqueue', 'last_sample', 'enqueue'),
+    ('queue_wait', 'enqueue', 'dequeue'),
+    ('preprocess', 'dequeue', 'preprocessed'),
+    ('predict', 'preprocessed', 'predicted'),
+    ('delivery', 'predicted', 'consumed'),
+    ('render', 'consumed', 'rendered'),
+]
+
+
+class LatencyTracer:
+    """Rolling per-stage latency percentiles, safe to use from several threads"""
+
+    def __init__(self, history=1000):
+        self._lock = threading.Lock()
+        self._samples = {name: deque(maxlen=history)
+                         for name in [s[0] for s in STAGES] + ['end_to_end']}
+
+    def record(self, stamps):
+        """Add one window's timestamps; stages with a missing stamp are skipped"""
+        with self._lock:
+            for name, start, end in STAGES:
+                if start in stamps and end in stamps:
+                    self._samples[name].append(stamps[end] - stamps[start])
+            last = stamps.get('rendered', stamps.get('consumed'))
+            if last is not None and 'last_sample' in stamps:
+                self._samples['end_to_end'].append(last - stamps['last_sample'])
+
+    def percentiles(self):
+        """{stage: {'count', 'p50_ms', 'p95_ms', 'p99_ms'}} over the rolling history"""
+        with self._lock:
+            snapshot = {name: np.array(values) for name, values in self._samples.items()}
+        report = {}
+        for name, values in snapshot.items():
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = np.percentile(values * 1e3, [50, 95, 99])
+            report[name] = {'count': len(values), 'p50_ms': float(p50),
+                            'p95_ms': float(p95), 'p99_ms': float(p99)}
+        return report
+
+    def dump(self, path=None):
+        """Print the percentile table, and write it as JSON if `path` is given"""
+        report = self.percentiles()
+        print('{:<14}{:>8}{:>10}{:>10}{:>10}'.format('stage', 'count', 'p50 ms', 'p95 ms', 'p99 ms'))
+        for name, row in report.items():
+            print('{:<14}{count:>8}{p50_ms:>10.2f}{p95_ms:>10.2f}{p99_ms:>10.2f}'.format(name, **row))
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+        return report
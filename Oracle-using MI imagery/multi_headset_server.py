@@ -0,0 +1,226 @@
+"""
+multi_headset_server.py - One OSC front end and one inference pool for several Muse headsets
+
+Running a PeriodicPredictor per headset means one TensorFlow model in memory
+per user. MultiHeadsetServer instead keeps only the cheap per-user state (ring
+buffer, shared-memory window slots, blink tracking, prediction output queue)
+in a HeadsetSession and feeds all users' windows to a shared pool of
+inference workers. Each worker loads the model once and batches windows
+across users into a single forward pass. Every user is served by one
+worker only, so that user's predictions come back in window order.
+
+Streams are told apart either by UDP port (`ports={'alice': 5000, 'bob': 5001}`)
+or by an OSC address prefix on one port (`prefixes=['alice', 'bob']` expects
+/alice/muse/eeg, /bob/Marker/1, ...).
+"""
+
+import multiprocessing
+import queue
+import threading
+import numpy as np
+from timeit import default_timer as timer
+from osc_ingest import OSCIngestServer
+from osc_fastpath import FastPathDispatcher
+from periodic_predictor import PeriodicPredictor, _load_backend, _read_batch, _classify
+
+
+class _PoolNotifier:
+    """Stands in for a session's WindowScheduler and forwards its windows to the pool
+
+    The pool worker counts the user's windows it predicted and the ones it
+    dropped (pruned under load or overwritten in the ring) in shared counters,
+    so depth() and stats() are per user like WindowScheduler's.
+    """
+
+    def __init__(self, user_id, notify_queue):
+        self.user_id = user_id
+        self.notify_queue = notify_queue
+        self.published = 0
+        self.predicted = multiprocessing.Value('q', 0)
+        self.dropped = multiprocessing.Value('q', 0)
+
+    def publish(self, seq):
+        self.published += 1
+        self.notify_queue.put((self.user_id, seq))
+
+    def depth(self):
+        return max(0, self.published - self.predicted.value - self.dropped.value)
+
+    def stats(self):
+        return {'policy': 'pool', 'published': self.published, 'depth': self.depth(),
+                'dropped': self.dropped.value}
+
+    def close(self):
+        pass
+
+
+class HeadsetSession(PeriodicPredictor):
+    """Per-user ingest state; exposes the PeriodicPredictor API to a CarouselController
+
+    The inference process and OSC server belong to MultiHeadsetServer, so
+    `start_server` is not used on a session.
+    """
+
+    def __init__(self, user_id, notify_queue, max_queue_depth=4, filter_band=None, notch_freq=None):
+        super().__init__(model_path=None, max_queue_depth=max_queue_depth,
+                         filter_band=filter_band, notch_freq=notch_freq)
+        self.user_id = user_id
+        self.scheduler = _PoolNotifier(user_id, notify_queue)
+
+
+def _pool_worker(model_path, backend, window_rings, output_queues, counters, notify_queue,
+                 fs, window_duration, max_batch, max_depth):
+    """
+    Inference worker shared by the headsets assigned to it.
+    Drains up to `max_batch` pending windows from any of its users, predicts
+    them in one forward pass and routes each result to its user's output
+    queue. `counters` maps each user to its (predicted, dropped) Values.
+    """
+    first_ring = next(iter(window_rings.values()))
+    n_samples, n_channels = first_ring.window_shape
+    model = _load_backend(backend, model_path, n_channels, n_samples)
+    print(f"Pool worker ready ({multiprocessing.current_process().name})")
+
+    running = True
+    while running:
+        item = notify_queue.get()
+        pending = []
+        while item is not None:
+            pending.append(item)
+            if len(pending) >= max_batch:
+                break
+            try:
+                item = notify_queue.get_nowait()
+            except queue.Empty:
+                break
+        if item is None:
+            running = False
+        if not pending:
+            continue
+        dequeued = timer()
+
+        # Group by user, keeping only each user's newest `max_depth` windows
+        by_user = {}
+        for user_id, seq in pending:
+            by_user.setdefault(user_id, []).append(seq)
+
+        inputs, routes = [], []
+        for user_id, seqs in by_user.items():
+            x, kept = _read_batch(window_rings[user_id], seqs[-max_depth:], fs, window_duration)
+            dropped = counters[user_id][1]
+            with dropped.get_lock():
+                dropped.value += len(seqs) - len(kept)
+            if x is None:
+                continue
+            inputs.append(x)
+            routes.extend((user_id, seq, stamps) for seq, stamps in kept)
+        if not inputs:
+            continue
+        preprocessed = timer()
+
+        y = model.predict(np.concatenate(inputs, axis=0))
+        predicted = timer()
+        for (user_id, seq, stamps), (result, conf) in zip(routes, _classify(y)):
+            stamps.update(dequeue=dequeued, preprocessed=preprocessed, predicted=predicted)
+            output_queues[user_id].put((result, conf, {'seq': seq, 'time': stamps['last_sample'],
+                                                       'stamps': stamps}))
+            predicted_count = counters[user_id][0]
+            with predicted_count.get_lock():
+                predicted_count.value += 1
+
+
+class MultiHeadsetServer:
+    """Accepts several headset streams and serves them from one inference pool"""
+
+    def __init__(self, model_path, ports=None, prefixes=None, ip="0.0.0.0", port=5000,
+                 backend='keras', n_workers=1, max_batch=16, max_queue_depth=4):
+        if (ports is None) == (prefixes is None):
+            raise ValueError("Pass either ports={user: port} or prefixes=[user, ...]")
+        self.model_path = model_path
+        self.backend = backend
+        self.ip = ip
+        self.port = port
+        self.n_workers = n_workers
+        self.max_batch = max_batch
+        self.max_queue_depth = max_queue_depth
+
+        # One notify queue per worker; a user's windows all go to the same one
+        self.notify_queues = [multiprocessing.Queue() for _ in range(n_workers)]
+        users = list(ports) if ports is not None else list(prefixes)
+        self.sessions = {user_id: HeadsetSession(user_id, self.notify_queues[i % n_workers],
+                                                 max_queue_depth)
+                         for i, user_id in enumerate(users)}
+
+        # One dispatcher per UDP port
+        self.dispatchers = {}
+        if ports is not None:
+            for user_id, user_port in ports.items():
+                self.dispatchers[user_port] = self._map(FastPathDispatcher(), self.sessions[user_id], '')
+        else:
+            dispatcher = FastPathDispatcher()
+            for user_id in prefixes:
+                self._map(dispatcher, self.sessions[user_id], '/' + user_id)
+            self.dispatchers[port] = dispatcher
+
+        self.servers = []
+        self.workers = []
+
+    @staticmethod
+    def _map(dispatcher, session, prefix):
+        dispatcher.map_samples(prefix + "/muse/eeg", session.eeg_handler, session.eeg_block_handler)
+        dispatcher.map(prefix + "/Marker/*", session.marker_handler)
+        dispatcher.map(prefix + "/muse/elements/blink", session.blink_handler)
+        dispatcher.map(prefix + "/muse/elements/jaw_clench", session.jaw_handler)
+        return dispatcher
+
+    def session(self, user_id):
+        """The HeadsetSession to hand to that user's CarouselController"""
+        return self.sessions[user_id]
+
+    def start_server(self):
+        """Launch the inference pool and one OSC server thread per port"""
+        any_session = next(iter(self.sessions.values()))
+        for notify_queue in self.notify_queues:
+            sessions = {u: s for u, s in self.sessions.items() if s.scheduler.notify_queue is notify_queue}
+            if not sessions:
+                continue
+            worker = multiprocessing.Process(
+                target=_pool_worker,
+                args=(
+                    self.model_path,
+                    self.backend,
+                    {u: s.window_ring for u, s in sessions.items()},
+                    {u: s.prediction_output_queue for u, s in sessions.items()},
+                    {u: (s.scheduler.predicted, s.scheduler.dropped) for u, s in sessions.items()},
+                    notify_queue,
+                    any_session.fs,
+                    any_session.window_duration,
+                    self.max_batch,
+                    self.max_queue_depth
+                )
+            )
+            worker.start()
+            self.workers.append(worker)
+
+        threads = []
+        for port, dispatcher in self.dispatchers.items():
+            server = OSCIngestServer((self.ip, port), dispatcher)
+            print(f"Listening on {self.ip}:{port}")
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.servers.append(server)
+            threads.append(thread)
+        return threads
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+        for notify_queue in self.notify_queues:
+            notify_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=2)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        for session in self.sessions.values():
+            session.window_ring.close()
@@ -0,0 +1,152 @@
+"""
+online_finetune.py - Background fine-tuning of the last layers on labelled live windows
+
+While the user follows a cue, the operator sends /Marker/3 (Left) or
+/Marker/4 (Right), and /Marker/5 when the segment ends. PeriodicPredictor
+forwards every window recorded inside such a segment to the fine-tune
+process, which keeps them in a bounded ReplayBuffer. Live windows overlap
+by ~90%, so validation holds out whole segments rather than single
+windows: every `val_every`-th segment of each label goes to the validation
+buffer, which therefore holds both classes in equal measure whatever order
+the cues come in.
+
+Whenever `update_every` new windows have arrived, the worker trains the last
+`n_trainable` layers with weights for a few epochs on a single thread, so
+the inference worker keeps its CPU. The candidate is scored on the held-out
+windows, and no round runs until they include every class, since a model
+that has collapsed onto one class scores well on that class alone. If the
+candidate is at least as accurate as the weights currently deployed, its
+weights go to the inference worker, which swaps them in between two
+batches. Otherwise the worker rolls back to the deployed weights. A
+('rollback',) message restores the original model.h5 weights.
+"""
+
+import queue
+import numpy as np
+from preprocessing import preprocess_window
+
+
+class ReplayBuffer:
+    """Bounded FIFO of preprocessed (window, label) pairs"""
+
+    def __init__(self, capacity, input_shape):
+        self.capacity = capacity
+        self.x = np.zeros((capacity,) + tuple(input_shape), dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.count = 0            # windows ever added
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def add(self, x, y):
+        i = self.count % self.capacity
+        self.x[i] = x
+        self.y[i] = y
+        self.count += 1
+
+    def data(self):
+        n = len(self)
+        return self.x[:n], self.y[:n]
+
+
+def freeze_for_finetune(model, n_trainable=3):
+    """Leave only the last `n_trainable` layers that have weights trainable
+
+    Frozen BatchNormalization layers also stop updating their statistics.
+    """
+    remaining = n_trainable
+    for layer in reversed(model.layers):
+        if layer.weights and remaining > 0:
+            layer.trainable = True
+            remaining -= 1
+        else:
+            layer.trainable = False
+    return [layer.name for layer in model.layers if layer.trainable and layer.weights]
+
+
+def accuracy(model, x, y):
+    if len(x) == 0:
+        return None
+    y_ = model(x, training=False).numpy()
+    return float(np.mean(np.argmax(y_, axis=-1) == y))
+
+
+def _finetune_worker(model_path, sample_queue, weights_queue, status_queue, fs, window_duration,
+                     n_trainable=3, capacity=512, val_every=5, min_windows=64, update_every=32,
+                     epochs=3, batch_size=16, learning_rate=1e-4):
+    """
+    Fine-tune process. Receives (raw window, label, segment) tuples, ('rollback',)
+    or a None sentinel on `sample_queue`; sends accepted weights as (version, weights)
+    on `weights_queue` and a status dict per round on `status_queue`. No round
+    runs before the held-out segments cover every class.
+    """
+    import tensorflow as tf
+    # One thread, so fine-tuning never starves the inference worker
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    from train import train
+
+    model = tf.keras.models.load_model(model_path)
+    trainable = freeze_for_finetune(model, n_trainable)
+    print(f"Fine-tuning layers {trainable}")
+    original = model.get_weights()
+    deployed = original
+    input_shape = model.input_shape[1:]
+    n_classes = model.output_shape[-1]
+    train_buffer = ReplayBuffer(capacity, input_shape)
+    val_buffer = ReplayBuffer(max(1, capacity // val_every), input_shape)
+    received, last_update, version = 0, 0, 0
+    segments = {}                 # label -> labelled segments seen
+    segment, held_out = None, False
+
+    while True:
+        item = sample_queue.get()
+        pending = [item]
+        while True:
+            try:
+                pending.append(sample_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        for item in pending:
+            if item is None:
+                return
+            if isinstance(item[0], str) and item[0] == 'rollback':
+                version += 1
+                deployed = original
+                model.set_weights(original)
+                weights_queue.put((version, original))
+                status_queue.put({'version': version, 'accepted': True, 'rollback': True})
+                continue
+            window, label, window_segment = item
+            if window_segment != segment:
+                segment = window_segment
+                segments[label] = segments.get(label, 0) + 1
+                held_out = segments[label] % val_every == 0
+            x = preprocess_window(window, fs, window_duration)[0].astype(np.float32)
+            (val_buffer if held_out else train_buffer).add(x, label)
+            received += 1
+
+        if len(train_buffer) < min_windows or received - last_update < update_every:
+            continue
+        x_val, y_val = val_buffer.data()
+        if len(np.unique(y_val)) < n_classes:
+            continue
+        last_update = received
+
+        x_train, y_train = train_buffer.data()
+        baseline = accuracy(model, x_val, y_val)
+        train(model, x_train, y_train, epochs=epochs, batch_size=batch_size,
+              optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), verbose=False)
+        candidate = accuracy(model, x_val, y_val)
+
+        accepted = candidate >= baseline
+        if accepted:
+            version += 1
+            deployed = model.get_weights()
+            weights_queue.put((version, deployed))
+        else:
+            model.set_weights(deployed)
+        status_queue.put({'version': version, 'accepted': accepted, 'rollback': not accepted,
+                          'val_acc': candidate, 'baseline_acc': baseline,
+                          'train_windows': len(train_buffer), 'val_windows': len(val_buffer)})
@@ -0,0 +1,131 @@
+"""
+osc_fastpath.py - Fast-path decoding of fixed-layout float OSC messages
+
+pythonosc's Dispatcher parses every packet into OscMessage objects, matches
+the address against every mapped pattern, unpacks the arguments into Python
+floats and calls the handler through a varargs wrapper. For /muse/eeg that
+is the whole per-sample cost of ingest, for a message whose layout never
+changes: a padded address, a ",ffff..." type tag and big-endian float32s.
+
+FastPathDispatcher recognises messages mapped with map_samples() by their
+address bytes and decodes them itself:
+
+    single message   one precompiled struct.Struct per type tag, then
+                     handler(address, *values), as the Dispatcher would call it
+    bundle           when every element is the same mapped address and type
+                     tag, all samples are read in one strided np.frombuffer
+                     view and passed as one (n, values) array to block_handler,
+                     with the bundle's time tag
+
+Anything else, including other addresses, wildcard patterns, mixed or
+nested bundles and malformed data, goes through the normal Dispatcher.
+
+    dispatcher = FastPathDispatcher()
+    dispatcher.map_samples("/muse/eeg", eeg_handler, eeg_block_handler)
+    dispatcher.map("/Marker/*", marker_handler)
+"""
+
+import struct
+import numpy as np
+from pythonosc.dispatcher import Dispatcher
+
+BUNDLE = b'#bundle\x00'
+_BUNDLE_HEADER = 16         # '#bundle\0' and the 8 byte time tag
+_IMMEDIATELY = 1
+
+
+def _osc_string(text):
+    """`text` as OSC encodes it: NUL terminated, padded to 4 bytes"""
+    data = text.encode() + b'\x00'
+    return data + b'\x00' * (-len(data) % 4)
+
+
+class FastPathDispatcher(Dispatcher):
+    """Dispatcher that decodes float-only messages of selected addresses without pythonosc"""
+
+    def __init__(self):
+        super().__init__()
+        self._fast = {}         # address bytes -> (address, handler, block_handler)
+        self._layouts = {}      # message header -> (address, handler, block_handler, values, Struct)
+
+    def map_samples(self, address, handler, block_handler=None):
+        """Fast-path `address`, an exact address whose arguments are all floats
+
+        handler(address, *values) gets single messages. block_handler(address,
+        samples, timetag) gets bundles as a float64 (n, values) array, with the
+        bundle's time tag in seconds on the sender's clock (None when it is
+        "immediately"); without one, handler is called once per bundled message.
+        """
+        self._fast[_osc_string(address)] = (address, handler, block_handler)
+        # Keep it known to the normal dispatcher for packets the fast path declines
+        self.map(address, handler)
+
+    def _layout(self, data, offset=0, size=None):
+        """(header length, layout) of a fast-path message at `offset`, or None"""
+        end = len(data) if size is None else offset + size
+        for key, (address, handler, block_handler) in self._fast.items():
+            if data.startswith(key, offset):
+                break
+        else:
+            return None
+        tag_start = offset + len(key)
+        tag_end = data.find(b'\x00', tag_start, end)
+        if tag_end < 0:
+            return None
+        header_len = ((tag_end + 4) & ~3) - offset      # type tag padded to 4 bytes
+        header = bytes(data[offset:offset + header_len])
+        layout = self._layouts.get(header)
+        if layout is None:
+            tag = data[tag_start:tag_end]
+            values = len(tag) - 1
+            if tag[:1] != b',' or tag[1:] != b'f' * values or not values:
+                return None
+            layout = (address, handler, block_handler, values, struct.Struct(f'>{values}f'))
+            self._layouts[header] = layout
+        if end - offset != header_len + 4 * layout[3]:
+            return None
+        return header_len, layout
+
+    def _message(self, data):
+        found = self._layout(data)
+        if found is None:
+            return False
+        header_len, (address, handler, _, _, unpack) = found
+        handler(address, *unpack.unpack_from(data, header_len))
+        return True
+
+    def _bundle(self, data):
+        if len(data) < _BUNDLE_HEADER + 4:
+            return False
+        size = int.from_bytes(data[_BUNDLE_HEADER:_BUNDLE_HEADER + 4], 'big')
+        found = self._layout(data, _BUNDLE_HEADER + 4, size)
+        stride = 4 + size
+        if found is None or (len(data) - _BUNDLE_HEADER) % stride:
+            return False
+        header_len, (address, handler, block_handler, values, _) = found
+        n = (len(data) - _BUNDLE_HEADER) // stride
+
+        # Every element must carry the same size prefix and message header
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        headers = np.lib.stride_tricks.as_strided(
+            buffer[_BUNDLE_HEADER:], shape=(n, 4 + header_len), strides=(stride, 1))
+        if n > 1 and not (headers[1:] == headers[0]).all():
+            return False
+        samples = np.ndarray((n, values), dtype='>f4', buffer=data,
+                             offset=_BUNDLE_HEADER + 4 + header_len, strides=(stride, 4))
+        samples = samples.astype(np.float64)
+        if block_handler is not None:
+            timetag = int.from_bytes(data[8:_BUNDLE_HEADER], 'big')
+            timetag = None if timetag == _IMMEDIATELY else timetag / 2**32
+            block_handler(address, samples, timetag)
+        else:
+            for sample in samples.tolist():
+                handler(address, *sample)
+        return True
+
+    def call_handlers_for_packet(self, data, client_address):
+        if self._fast:
+            handled = self._bundle(data) if data.startswith(BUNDLE) else self._message(data)
+            if handled:
+                return []
+        return super().call_handlers_for_packet(data, client_address)
@@ -0,0 +1,67 @@
+"""
+osc_ingest.py - Single-thread asyncio OSC ingest server
+
+ThreadingOSCUDPServer starts an OS thread for every datagram, which at the
+Muse EEG rate means hundreds of thread creations a second, handlers running
+concurrently and out of order on the shared ring buffers. OSCIngestServer
+runs pythonosc's AsyncIOOSCUDPServer on one event loop in one thread
+instead: every /muse/eeg, /Marker/*, blink and jaw message is handled to
+completion, in arrival order, before the next one is read. Handlers may
+therefore mutate their state without locks; whatever other threads need
+goes out through thread-safe queues (WindowScheduler, queue.SimpleQueue).
+
+It keeps the socketserver interface the callers already use:
+
+    server = OSCIngestServer((ip, port), dispatcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ...
+    server.shutdown()       # from any thread, including a handler
+"""
+
+import asyncio
+import threading
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+
+
+class OSCIngestServer:
+    """AsyncIOOSCUDPServer on a private event loop, driven like a socketserver"""
+
+    def __init__(self, server_address, dispatcher):
+        self.server_address = server_address
+        self.dispatcher = dispatcher
+        self.loop = asyncio.new_event_loop()
+        self.transport = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._server = AsyncIOOSCUDPServer(server_address, dispatcher, self.loop)
+        # Bind now, so a busy port fails in the constructor like socketserver's
+        self.transport, _ = self.loop.run_until_complete(self._server.create_serve_endpoint())
+        self.server_address = self.transport.get_extra_info('sockname')[:2]
+
+    def serve_forever(self):
+        """Handle datagrams on the calling thread until shutdown()"""
+        self._thread = threading.get_ident()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.transport.close()
+            # Let the transport finish closing before the loop goes away
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+            self._stopped.set()
+
+    def shutdown(self):
+        """Stop serve_forever(); waits for it unless called from a handler"""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread is not None and self._thread != threading.get_ident():
+            self._stopped.wait()
+
+    def server_close(self):
+        """Release the socket of a server that never served"""
+        if self._thread is None and not self.loop.is_closed():
+            self.transport.close()
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
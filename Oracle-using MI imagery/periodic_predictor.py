@@ -0,0 +1,465 @@
+import multiprocessing
+import queue
+import threading
+import numpy as np
+from timeit import default_timer as timer
+from ring_buffer import RingBuffer
+from shm_transport import SharedWindowRing
+from inference_scheduler import WindowScheduler
+from preprocessing import preprocess_window
+from streaming_filter import StreamingFilter
+from latency_tracer import LatencyTracer
+from stream_monitor import StreamMonitor, GAP_MODES
+from osc_ingest import OSCIngestServer
+from osc_fastpath import FastPathDispatcher
+
+# Timestamps the OSC side stores with every window in shared memory
+WINDOW_STAMPS = ('last_sample', 'first_sample', 'enqueue')
+
+
+def _load_backend(backend, model_path, n_channels, n_samples):
+    """Import lazily so the TFLite backend never pulls in TensorFlow"""
+    if backend == 'tflite':
+        from tflite_backend import TFLiteBackend
+        return TFLiteBackend(model_path, n_channels, n_samples)
+    if backend == 'keras':
+        from inference_backend import KerasBackend
+        return KerasBackend(model_path, n_channels, n_samples)
+    raise ValueError(f"Unknown inference backend '{backend}'")
+
+
+def _read_batch(window_ring, seqs, fs, window_duration):
+    """Preprocess the windows `seqs` straight from shared memory into one batch
+
+    Returns (x, kept) where x is (N, channels, samples, 1) and `kept` lists the
+    (seq, stamps) of the windows that were still intact, in order.
+    """
+    inputs, kept = [], []
+    for seq in seqs:
+        slot = seq % window_ring.n_slots
+        raw_data = window_ring.read(slot, seq)
+        if raw_data is None:
+            continue
+        # Average reference + epoching, bit-identical to the MNE path
+        x = preprocess_window(raw_data, fs, window_duration)
+        stamps = dict(zip(WINDOW_STAMPS, window_ring.stamps(slot)))
+        if not window_ring.is_current(slot, seq):
+            # Overwritten by the OSC process while we were reading it
+            continue
+        inputs.append(x)
+        kept.append((seq, stamps))
+    if not inputs:
+        return None, kept
+    return np.concatenate(inputs, axis=0), kept
+
+
+def _classify(y):
+    """Turn (N, 2) class probabilities into ("left"|"right", confidence) pairs"""
+    results = []
+    for probs in y:
+        if probs[0] > probs[1]:
+            results.append(("left", float(probs[0])))
+        else:
+            results.append(("right", float(probs[1])))
+    return results
+
+
+def _swap_weights(model, weights_queue):
+    """Load the newest fine-tuned weights, if any arrived since the last batch"""
+    latest = None
+    while True:
+        try:
+            latest = weights_queue.get_nowait()
+        except queue.Empty:
+            break
+    if latest is not None:
+        version, weights = latest
+        # The traced forward pass reads the variables, so no retrace is needed
+        model.model.set_weights(weights)
+        print(f"Fine-tuned weights v{version} loaded")
+
+
+def _inference_worker(model_path, backend, window_ring, scheduler, output_queue,
+                      fs, window_duration, window_overlap, max_batch=1, weights_queue=None):
+    """
+    Top-level inference worker for EEG predictions.
+    Runs in a separate process and only receives simple, picklable arguments.
+
+    Every pending window, up to `max_batch`, goes through a single forward
+    pass; results are emitted in window order as (result, conf, meta) where
+    meta holds the window seq, its completion time and its latency stamps.
+    With a `weights_queue`, weights from the fine-tune process are swapped in
+    between batches.
+    """
+    print(f"Loading model from {model_path}")
+    n_samples, n_channels = window_ring.window_shape
+    model = _load_backend(backend, model_path, n_channels, n_samples)
+    print("Model loaded successfully")
+
+    while True:
+        # Block until the OSC process publishes windows; empty means shut down
+        seqs = scheduler.next_batch(max_batch)
+        if not seqs:
+            break
+        dequeued = timer()
+        if weights_queue is not None:
+            _swap_weights(model, weights_queue)
+
+        x, kept = _read_batch(window_ring, seqs, fs, window_duration)
+        if x is None:
+            continue
+        preprocessed = timer()
+
+        # Predict
+        y = model.predict(x)
+        predicted = timer()
+        for (seq, stamps), (result, conf) in zip(kept, _classify(y)):
+            stamps.update(dequeue=dequeued, preprocessed=preprocessed, predicted=predicted)
+            print(f"Predicted: {result} with confidence = {conf:.3f}")
+            output_queue.put((result, conf, {'seq': seq, 'time': stamps['last_sample'],
+                                             'stamps': stamps}))
+
+
+class PeriodicPredictor:
+    """
+    Handles EEG data collection via OSC and delegates prediction
+    to a separate process using the module-level `_inference_worker`.
+    """
+
+    def __init__(self, model_path='Models/EEGITNet/model.h5', ip="0.0.0.0", port=5000,
+                 backend='keras', overload_policy='drop_oldest', max_queue_depth=4,
+                 max_batch=4, filter_band=None, notch_freq=None, gap_mode=None,
+                 finetune=False, finetune_options=None):
+        # Configuration
+        self.ip = ip
+        self.port = port
+        self.model_path = model_path
+        self.backend = backend        # 'keras' for model.h5, 'tflite' for an exported .tflite
+
+        # EEG parameters
+        self.fs = 256
+        self.n_channels = 4
+        self.window_duration = 1
+        self.window_overlap = 0.2
+
+        # Optional streaming band-pass/notch stage between ingest and windowing.
+        # Off by default: the shipped model was trained on unfiltered data.
+        self.stream_filter = None
+        if filter_band is not None or notch_freq is not None:
+            self.stream_filter = StreamingFilter(self.fs, self.n_channels,
+                                                 band=filter_band, notch=notch_freq)
+
+        # Dropped/late packet accounting. gap_mode 'interpolate' fills gaps of up
+        # to stream_monitor.max_fill samples, 'flag' skips windows that span a gap
+        if gap_mode not in GAP_MODES:
+            raise ValueError(f"Unknown gap mode '{gap_mode}', expected one of {GAP_MODES}")
+        self.gap_mode = gap_mode
+        self.stream_monitor = StreamMonitor(self.fs)
+        self._since_gap = None         # samples received since the last gap
+        self._held = []                # (samples, arrival) behind the sample clock, not yet settled
+
+        # Buffers
+        self.window_samples = int(self.window_duration * self.fs)
+        self.buffer_main = RingBuffer(self.window_samples, self.n_channels)
+        self.arrival_times = RingBuffer(self.window_samples, 1)     # per-sample arrival, for tracing
+
+        # Recording state. All OSC handlers run on the single ingest thread, so
+        # the buffers above are never mutated concurrently
+        self.recording = False
+
+        # IPC with inference process: windows go through shared memory,
+        # the scheduler only hands over their sequence numbers
+        self.scheduler = WindowScheduler(overload_policy, max_queue_depth)
+        self.window_ring = SharedWindowRing(max(8, max_queue_depth + 2),
+                                            (self.window_samples, self.n_channels),
+                                            n_stamps=len(WINDOW_STAMPS))
+        self.prediction_output_queue = multiprocessing.Queue()
+        self.max_batch = max_batch
+        self.last_prediction_meta = None
+
+        # Online fine-tuning on windows labelled with /Marker/3 (Left), /Marker/4
+        # (Right), /Marker/5 (end of labelled segment); see online_finetune.py
+        if finetune and backend != 'keras':
+            raise ValueError("Online fine-tuning needs the 'keras' backend")
+        self.finetune = finetune
+        self.finetune_options = finetune_options or {}
+        self.train_label = None
+        self._labelled = 0             # samples since the current label started
+        self._segment = -1             # index of the current labelled segment
+        self.finetune_process = None
+        if finetune:
+            self.sample_queue = multiprocessing.Queue()
+            self.weights_queue = multiprocessing.Queue()
+            self.finetune_status_queue = multiprocessing.Queue()
+        else:
+            self.sample_queue = self.weights_queue = self.finetune_status_queue = None
+
+        # Per-stage latency from OSC packet to carousel frame
+        self.tracer = LatencyTracer()
+        self._untraced = None          # stamps of the last consumed, not yet rendered window
+
+        # OSC setup; /muse/eeg is decoded without pythonosc's generic parsing
+        self.dispatcher = FastPathDispatcher()
+        self.dispatcher.map_samples("/muse/eeg", self.eeg_handler, self.eeg_block_handler)
+        self.dispatcher.map("/Marker/*", self.marker_handler)
+        self.dispatcher.map("/muse/elements/blink", self.blink_handler)
+        self.dispatcher.map("/muse/elements/jaw_clench", self.jaw_handler)
+
+        # Blink tracking; events reach the UI thread through a queue
+        self.blinks = 0
+        self.blink_events = queue.SimpleQueue()
+        self.blink_times = []
+        self.jaw_clenches = 0
+        self.server = None
+        self.inference_process = None
+
+    def blink_handler(self, address, *args):
+        t = timer()
+        self.blink_times.append(t)
+        if len(self.blink_times) >= 2:
+            if (t - self.blink_times[-2]) < 0.7:
+                self.blink_events.put('double_blink')
+            else:
+                self.blink_events.put('blinked')
+        print("Blink event")
+
+    def jaw_handler(self, address, *args):
+        self.jaw_clenches += 1
+        print("Jaw clench event")
+
+    def eeg_handler(self, address, *args):
+        if self.recording:
+            sample = args[:4]
+            if self.stream_filter is not None:
+                sample = self.stream_filter.process_sample(sample)
+            arrived = timer()
+            settled = self.stream_monitor.update(arrived)
+            if settled is not None:
+                self._settle_gap(settled)
+            if self.gap_mode and self.stream_monitor.pending:
+                # Behind the sample clock: hold back until lost or late is known
+                self._held.append((np.asarray(sample, dtype=np.float64)[np.newaxis], arrived))
+                return
+            if self._since_gap is not None:
+                self._since_gap += 1
+            self.buffer_main.append(sample)
+            self.arrival_times.append(arrived)
+            if self.train_label is not None:
+                self._labelled += 1
+            if len(self.buffer_main) >= self.window_samples:
+                self._emit_window(arrived)
+
+    def eeg_block_handler(self, address, samples, timetag=None):
+        """Several samples decoded at once from an OSC bundle, as a (n, values) array"""
+        if not self.recording:
+            return
+        samples = samples[:, :self.n_channels]
+        if self.stream_filter is not None:
+            samples = self.stream_filter.process(samples)
+        arrived = timer()
+        settled = self.stream_monitor.update(arrived, len(samples), timetag)
+        if settled is not None:
+            self._settle_gap(settled)
+        if self.gap_mode and self.stream_monitor.pending:
+            self._held.append((samples, arrived))
+            return
+        self._append_block(samples, arrived)
+
+    def _append_block(self, samples, arrived):
+        """Write a block, emitting a window at every window boundary within it"""
+        i = 0
+        while i < len(samples):
+            take = min(len(samples) - i, self.window_samples - len(self.buffer_main))
+            self.buffer_main.extend(samples[i:i + take])
+            self.arrival_times.extend(np.full((take, 1), arrived))
+            if self._since_gap is not None:
+                self._since_gap += take
+            if self.train_label is not None:
+                self._labelled += take
+            i += take
+            if len(self.buffer_main) >= self.window_samples:
+                self._emit_window(arrived)
+
+    def _emit_window(self, arrived):
+        """Publish the full window in buffer_main and keep the overlap"""
+        if self.gap_mode == 'flag' and self._since_gap is not None \
+                and self._since_gap < self.window_samples:
+            self.stream_monitor.flagged_windows += 1
+        else:
+            window = self.buffer_main.window(self.window_samples, copy=False)
+            first_sample = self.arrival_times.window(1, copy=False)[0, 0]
+            slot, seq = self.window_ring.write(window, arrived, first_sample, timer())
+            self.scheduler.publish(seq)
+            if self.train_label is not None and self._labelled >= self.window_samples:
+                # Only windows lying entirely inside the labelled segment
+                self.sample_queue.put((np.array(window), self.train_label, self._segment))
+        # retain overlap
+        keep = int(self.window_duration * (1 - self.window_overlap*0.5) * self.fs)
+        self.buffer_main.consume(len(self.buffer_main) - keep)
+        self.arrival_times.consume(len(self.arrival_times) - keep)
+
+    def _settle_gap(self, missing):
+        """The held samples were preceded by `missing` lost samples (0: they were only late)"""
+        held, self._held = self._held, []
+        if missing and self.gap_mode and held:
+            first, arrived = held[0]
+            if self.gap_mode == 'interpolate' and missing <= self.stream_monitor.max_fill \
+                    and len(self.buffer_main):
+                previous = self.buffer_main.latest(1, copy=False)[0]
+                self._append_block(self.stream_monitor.interpolate(previous, first[0], missing), arrived)
+            else:
+                self._since_gap = 0
+        for samples, arrived in held:
+            self._append_block(samples, arrived)
+
+    def marker_handler(self, address, *args):
+        marker = address[-1]
+        if marker == '1':
+            if self.stream_filter is not None:
+                self.stream_filter.reset()
+            # Never let a window span two recordings
+            self.buffer_main.clear()
+            self.arrival_times.clear()
+            self.stream_monitor.reset()
+            self._since_gap = None
+            self._held = []
+            self.recording = True
+            print("Recording started")
+        elif marker == '2':
+            self.recording = False
+            if self.server:
+                self.server.shutdown()
+            print("Recording stopped")
+        elif marker in ('3', '4') and self.finetune:
+            self.train_label = 0 if marker == '3' else 1      # class index, as in training
+            self._labelled = 0
+            self._segment += 1
+            print(f"Labelling windows as {'Left' if marker == '3' else 'Right'}")
+        elif marker == '5' and self.finetune:
+            self.train_label = None
+            print("Labelled segment ended")
+
+    def start_server(self):
+        """Launch OSC server thread and inference process."""
+        self.server = OSCIngestServer((self.ip, self.port), self.dispatcher)
+        print(f"Listening on {self.ip}:{self.port}")
+        server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        server_thread.start()
+        self.start_inference()
+        return server_thread
+
+    def start_inference(self):
+        """Launch only the inference process, for feeding eeg_handler directly (replay, benchmarks)"""
+        self.inference_process = multiprocessing.Process(
+            target=_inference_worker,
+            args=(
+                self.model_path,
+                self.backend,
+                self.window_ring,
+                self.scheduler,
+                self.prediction_output_queue,
+                self.fs,
+                self.window_duration,
+                self.window_overlap,
+                self.max_batch,
+                self.weights_queue
+            )
+        )
+        self.inference_process.start()
+        if self.finetune:
+            from online_finetune import _finetune_worker
+            self.finetune_process = multiprocessing.Process(
+                target=_finetune_worker,
+                args=(self.model_path, self.sample_queue, self.weights_queue,
+                      self.finetune_status_queue, self.fs, self.window_duration),
+                kwargs=self.finetune_options,
+                daemon=True
+            )
+            self.finetune_process.start()
+        return self.inference_process
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+        if self.finetune_process:
+            self.sample_queue.put(None)
+            self.finetune_process.join(timeout=5)
+            if self.finetune_process.is_alive():
+                self.finetune_process.terminate()
+            # Windows nobody will read any more must not block interpreter exit
+            self.sample_queue.cancel_join_thread()
+        self.scheduler.close()
+        if self.inference_process:
+            # The worker exits on its own once it sees the closed scheduler,
+            # unless it is stuck in a prediction
+            self.inference_process.join(timeout=2)
+            if self.inference_process.is_alive():
+                self.inference_process.terminate()
+                self.inference_process.join()
+        self.window_ring.close()
+        print(f"EEG stream: {self.stream_monitor.summary()}")
+        self.dump_latency()
+
+    def get_blink_status(self):
+        """Whether a single and/or double blink happened since the last call"""
+        status = {'blinked': False, 'double_blink': False}
+        while True:
+            try:
+                status[self.blink_events.get_nowait()] = True
+            except queue.Empty:
+                return status
+
+    def get_queue_depth(self):
+        """Number of windows waiting for the inference process"""
+        return self.scheduler.depth()
+
+    def get_scheduler_stats(self):
+        return self.scheduler.stats()
+
+    def get_stream_stats(self):
+        """Effective sample rate, estimated drops, gaps and reorders of the EEG stream"""
+        return self.stream_monitor.stats()
+
+    def get_finetune_status(self):
+        """Status dicts of the fine-tune rounds finished since the last call"""
+        statuses = []
+        while self.finetune_status_queue is not None:
+            try:
+                statuses.append(self.finetune_status_queue.get_nowait())
+            except queue.Empty:
+                break
+        return statuses
+
+    def rollback_finetune(self):
+        """Put the original model weights back into the inference worker"""
+        if self.sample_queue is not None:
+            self.sample_queue.put(('rollback',))
+
+    def get_next_prediction(self, with_meta=False):
+        """Next (result, confidence), or None if nothing new has been predicted
+
+        With with_meta=True the tuple also carries {'seq', 'time', 'stamps'} of
+        the window the prediction was made on; the last one is kept in
+        last_prediction_meta.
+        """
+        if not self.prediction_output_queue.empty():
+            result, conf, meta = self.prediction_output_queue.get()
+            meta['stamps']['consumed'] = timer()
+            if self._untraced is not None:
+                # Superseded before a frame showed it
+                self.tracer.record(self._untraced)
+            self._untraced = meta['stamps']
+            self.last_prediction_meta = meta
+            return (result, conf, meta) if with_meta else (result, conf)
+        return None
+
+    def mark_rendered(self):
+        """Called by the UI after a frame is drawn; completes the pending trace"""
+        if self._untraced is not None:
+            self._untraced['rendered'] = timer()
+            self.tracer.record(self._untraced)
+            self._untraced = None
+
+    def dump_latency(self, path=None):
+        """Print rolling p50/p95/p99 per stage, optionally writing them to JSON"""
+        return self.tracer.dump(path)
@@ -0,0 +1,92 @@
+"""
+ring_buffer.py - Fixed-capacity circular buffer for raw EEG samples
+
+The OSC handlers push one sample at a time at 256 Hz. Growing a NumPy array
+with np.append copies the whole buffer on every sample, so this buffer keeps
+a preallocated array instead and writes each sample in O(1).
+
+Every sample is stored twice, at `i` and `i + capacity`, so the most recent
+`capacity` samples are always one contiguous slice of the backing array.
+That lets `window()` hand out a view without ever stitching two halves.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """Circular (samples, channels) buffer with O(1) per-sample writes."""
+
+    def __init__(self, capacity, n_channels, dtype=np.float64):
+        self.capacity = int(capacity)
+        self.n_channels = n_channels
+        self._data = np.zeros((2 * self.capacity, n_channels), dtype=dtype)
+        self._start = 0   # index of the oldest sample, always < capacity
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def full(self):
+        return self._size == self.capacity
+
+    def append(self, sample):
+        """Write one sample, overwriting the oldest one when full"""
+        pos = self._start + self._size
+        if self._size == self.capacity:
+            # Drop the oldest sample; the slot it used is the one we write to
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+        pos %= self.capacity
+        self._data[pos] = sample
+        self._data[pos + self.capacity] = sample
+
+    def extend(self, samples):
+        """Write a (n, channels) block of samples"""
+        samples = np.asarray(samples)
+        if len(samples) >= self.capacity:
+            # Only the newest `capacity` samples survive
+            samples = samples[-self.capacity:]
+            self._data[:self.capacity] = samples
+            self._data[self.capacity:] = samples
+            self._start = 0
+            self._size = self.capacity
+            return
+        n = len(samples)
+        pos = (self._start + self._size + np.arange(n)) % self.capacity
+        self._data[pos] = samples
+        self._data[pos + self.capacity] = samples
+        overflow = max(0, self._size + n - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._size = min(self.capacity, self._size + n)
+
+    def window(self, n, copy=True):
+        """Return the oldest `n` samples as a (n, channels) array
+
+        With copy=False the result is a view into the buffer and is only
+        valid until the next write.
+        """
+        if n > self._size:
+            raise ValueError(f"Requested {n} samples but only {self._size} are buffered")
+        view = self._data[self._start:self._start + n]
+        return view.copy() if copy else view
+
+    def latest(self, n, copy=True):
+        """Return the newest `n` samples as a (n, channels) array"""
+        if n > self._size:
+            raise ValueError(f"Requested {n} samples but only {self._size} are buffered")
+        end = self._start + self._size
+        view = self._data[end - n:end]
+        return view.copy() if copy else view
+
+    def consume(self, n):
+        """Discard the oldest `n` samples"""
+        n = min(int(n), self._size)
+        self._start = (self._start + n) % self.capacity
+        self._size -= n
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
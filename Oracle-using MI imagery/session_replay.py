@@ -0,0 +1,173 @@
+"""
+session_replay.py - Replay recorded sessions through PeriodicPredictor
+
+Streams the CSVs written by MotorImagery_OSC_Record.py sample by sample into
+PeriodicPredictor.eeg_handler, so windowing, shared-memory hand-off, batching
+and the model all run exactly as with a live headset. The ground-truth label
+is the first part of the file name (Left.2024-01-01 12_00_00.000000.csv).
+
+    python session_replay.py ../Recordings/MotorImagery --speed 0     # as fast as possible
+    python session_replay.py ../Recordings/MotorImagery --speed 1     # real time
+
+Every file starts with a /Marker/1, so no window spans two recordings. The
+scheduler runs with the 'queue' policy and the replay waits whenever the
+shared-memory ring is about to be overrun, so no window is dropped and every
+prediction can be matched back to its file by window sequence number.
+"""
+
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import time
+from timeit import default_timer as timer
+from periodic_predictor import PeriodicPredictor
+from streaming_filter import load_recording
+from dataset_builder import label_of
+
+
+def find_recordings(path, labels=None):
+    """CSV files under `path` (or `path` itself), optionally only the given labels"""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, '*.csv')))
+    else:
+        files = [path]
+    if labels:
+        files = [f for f in files if label_of(f) in labels]
+    return files
+
+
+class SessionReplay:
+    """Feeds recordings into a PeriodicPredictor and collects its predictions per file"""
+
+    def __init__(self, model_path, backend='keras', speed=0.0, max_queue_depth=8, max_batch=4):
+        self.speed = speed          # 1.0 is real time, 0 is as fast as possible
+        self.predictor = PeriodicPredictor(model_path=model_path, backend=backend,
+                                           overload_policy='queue',
+                                           max_queue_depth=max_queue_depth, max_batch=max_batch)
+        # Pending plus in-flight windows must stay below the ring size
+        self.max_pending = max(1, self.predictor.window_ring.n_slots - max_batch - 1)
+        self.files = []             # (path, label, first seq, end seq)
+        self.rows = []
+
+    def _stream(self, samples):
+        predictor = self.predictor
+        fs = predictor.fs
+        start = timer()
+        for i, sample in enumerate(samples):
+            if self.speed > 0:
+                ahead = start + i / (fs * self.speed) - timer()
+                if ahead > 0.001:
+                    time.sleep(ahead)
+            predictor.eeg_handler('/muse/eeg', *sample)
+            while predictor.scheduler.depth() >= self.max_pending:
+                self._collect()
+                time.sleep(0.0005)
+            if i % fs == 0:
+                self._collect()
+
+    def _collect(self):
+        while True:
+            prediction = self.predictor.get_next_prediction(with_meta=True)
+            if prediction is None:
+                return
+            result, conf, meta = prediction
+            self.rows.append((meta['seq'], result, conf))
+
+    def run(self, paths, timeout=30):
+        """Replay `paths` in order and return one row per predicted window"""
+        predictor = self.predictor
+        predictor.start_inference()
+        started = timer()
+        n_samples = 0
+        for path in paths:
+            samples = load_recording(path).to_numpy()
+            first_seq = predictor.window_ring.write_seq
+            predictor.marker_handler('/Marker/1')
+            self._stream([tuple(s) for s in samples])
+            predictor.marker_handler('/Marker/2')
+            self.files.append((path, label_of(path), first_seq, predictor.window_ring.write_seq))
+            n_samples += len(samples)
+
+        expected = predictor.window_ring.write_seq
+        deadline = timer() + timeout
+        while len(self.rows) < expected and timer() < deadline:
+            self._collect()
+            time.sleep(0.005)
+        self.elapsed = timer() - started
+        self.n_samples = n_samples
+        predictor.stop()
+        return self.results()
+
+    def results(self):
+        """Join predictions with the label of the file their window came from"""
+        by_seq = {seq: (result, conf) for seq, result, conf in self.rows}
+        rows = []
+        for path, label, first_seq, end_seq in self.files:
+            for seq in range(first_seq, end_seq):
+                if seq not in by_seq:
+                    continue
+                result, conf = by_seq[seq]
+                correct = result == label.lower() if label in ('Left', 'Right') else None
+                rows.append({'file': os.path.basename(path), 'label': label, 'seq': seq,
+                             'prediction': result, 'confidence': conf, 'correct': correct})
+        return rows
+
+    def report(self, rows):
+        """Print accuracy per file and overall, plus pipeline throughput"""
+        print('{:<44}{:>8}{:>10}{:>10}'.format('file', 'label', 'windows', 'accuracy'))
+        for path, label, first_seq, end_seq in self.files:
+            name = os.path.basename(path)
+            scored = [r['correct'] for r in rows if r['file'] == name and r['correct'] is not None]
+            n_windows = sum(1 for r in rows if r['file'] == name)
+            accuracy = f"{sum(scored) / len(scored):.3f}" if scored else '-'
+            print('{:<44}{:>8}{:>10}{:>10}'.format(name[:43], label, n_windows, accuracy))
+
+        scored = [r['correct'] for r in rows if r['correct'] is not None]
+        if scored:
+            print(f"Accuracy on Left/Right windows: {sum(scored) / len(scored):.3f} ({len(scored)} windows)")
+        expected = sum(end - first for _, _, first, end in self.files)
+        duration = self.n_samples / self.predictor.fs
+        print(f"Predicted {len(rows)}/{expected} windows from {duration:.1f} s of EEG "
+              f"in {self.elapsed:.2f} s ({duration / self.elapsed:.1f}x real time, "
+              f"{len(rows) / self.elapsed:.1f} windows/s, model load included)")
+
+
+def write_rows(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['file', 'label', 'seq', 'prediction', 'confidence', 'correct'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('recordings', nargs='?', default='../Recordings/MotorImagery',
+                        help='directory of recorded CSVs, or a single CSV')
+    parser.add_argument('--model', default='Models/EEG-ITNet/model.h5')
+    parser.add_argument('--backend', default='keras', choices=['keras', 'tflite'])
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='replay speed, 1 = real time, 0 = as fast as possible')
+    parser.add_argument('--labels', nargs='*', default=['Left', 'Right'],
+                        help='only replay files with these labels')
+    parser.add_argument('--max-batch', type=int, default=4)
+    parser.add_argument('--out', help='write per-window predictions to this CSV')
+    args = parser.parse_args(argv)
+
+    paths = find_recordings(args.recordings, args.labels)
+    if not paths:
+        print(f"No recordings found in {args.recordings}")
+        return 1
+    replay = SessionReplay(args.model, args.backend, args.speed, max_batch=args.max_batch)
+    rows = replay.run(paths)
+    replay.report(rows)
+    if args.out:
+        write_rows(rows, args.out)
+        print(f"Predictions written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+"""
+shm_transport.py - Shared-memory window handoff between the OSC and inference processes
+
+Windows are written straight into a ring of fixed-shape slots that both
+processes map with multiprocessing.shared_memory. Only the (slot, seq) pair
+travels through the notification channel, so the inference worker reads each
+window in place instead of unpickling a copy.
+
+Every slot carries the sequence number of the window it holds and a few
+timestamps about it, completion time first. A reader checks the sequence
+number before and after using the slot. If the writer has lapped the ring
+in the meantime, it no longer matches and the window is dropped.
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def _attach(name):
+    """Map an existing segment without registering it with the resource tracker"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no `track` argument
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedWindowRing:
+    """Ring of `n_slots` windows of shape `window_shape` in shared memory"""
+
+    # Header layout: int64 [write_seq, slot_seq_0, ..., slot_seq_n-1]
+    # followed by float64 [n_slots x n_stamps] timestamps
+    _HEADER_FIELDS = 1
+
+    def __init__(self, n_slots, window_shape, dtype=np.float64, name=None, n_stamps=1):
+        self.n_slots = int(n_slots)
+        self.window_shape = tuple(window_shape)
+        self.dtype = np.dtype(dtype)
+        self.n_stamps = int(n_stamps)
+
+        header_bytes = (self._HEADER_FIELDS + self.n_slots * (1 + self.n_stamps)) * 8
+        data_bytes = self.n_slots * int(np.prod(self.window_shape)) * self.dtype.itemsize
+
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=header_bytes + data_bytes)
+        else:
+            self._shm = _attach(name)
+
+        self._header = np.ndarray((self._HEADER_FIELDS + self.n_slots,), dtype=np.int64,
+                                  buffer=self._shm.buf)
+        self._seqs = self._header[self._HEADER_FIELDS:]
+        self._times = np.ndarray((self.n_slots, self.n_stamps), dtype=np.float64,
+                                 buffer=self._shm.buf,
+                                 offset=(self._HEADER_FIELDS + self.n_slots) * 8)
+        self._slots = np.ndarray((self.n_slots,) + self.window_shape, dtype=self.dtype,
+                                 buffer=self._shm.buf, offset=header_bytes)
+        if self._owner:
+            self._header[0] = 0
+            self._seqs[:] = -1
+            self._times[:] = 0.0
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def write_seq(self):
+        """Sequence number the next written window will get"""
+        return int(self._header[0])
+
+    def __getstate__(self):
+        # Child processes re-attach by name instead of copying the segment
+        return {'name': self.name, 'n_slots': self.n_slots,
+                'window_shape': self.window_shape, 'dtype': self.dtype.str,
+                'n_stamps': self.n_stamps}
+
+    def __setstate__(self, state):
+        self.__init__(state['n_slots'], state['window_shape'],
+                      dtype=state['dtype'], name=state['name'], n_stamps=state['n_stamps'])
+
+    def write(self, window, *stamps):
+        """Copy `window` and up to `n_stamps` timestamps into the next slot
+
+        Returns the (slot, seq) the window was written to.
+        """
+        seq = int(self._header[0])
+        slot = seq % self.n_slots
+        self._seqs[slot] = -1            # mark the slot as being written
+        self._slots[slot] = window
+        self._times[slot] = 0.0
+        self._times[slot, :len(stamps)] = stamps
+        self._seqs[slot] = seq
+        self._header[0] = seq + 1
+        return slot, seq
+
+    def read(self, slot, seq):
+        """Return the window in `slot` as a view, or None if it was overwritten
+
+        The view aliases shared memory; call `is_current` once done with it to
+        make sure the writer did not reuse the slot while it was being read.
+        """
+        if self._seqs[slot] != seq:
+            return None
+        return self._slots[slot]
+
+    def timestamp(self, slot):
+        """First timestamp passed to `write` for the window in `slot`"""
+        return float(self._times[slot, 0])
+
+    def stamps(self, slot):
+        """All timestamps passed to `write` for the window in `slot`"""
+        return tuple(float(t) for t in self._times[slot])
+
+    def is_current(self, slot, seq):
+        return self._seqs[slot] == seq
+
+    def close(self):
+        """Unmap the segment, and free it if this process created it"""
+        self._header = self._seqs = self._times = self._slots = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
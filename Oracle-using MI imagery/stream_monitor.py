@@ -0,0 +1,192 @@
+"""
+stream_monitor.py - Sample-rate, gap and drop accounting for the EEG stream
+
+Muse samples arrive over UDP, so packets can be lost or reordered without
+anyone noticing, and a "256 sample" window then covers more than a second.
+StreamMonitor is fed the timestamp of every sample, or of every block of
+samples (arrival time from default_timer, and the bundle time tag when the
+sender sets one), and keeps:
+
+    effective_hz   rate over the last `history_secs` seconds
+    dropped_est    samples expected from the elapsed time minus samples received
+    gaps           losses of samples, with the number of samples they are missing
+    late           packets that arrived behind the sample clock but were complete
+    jitter         mean change in lateness between packets, in samples
+    reorders       samples older than the one before them
+
+Gaps are judged on a sample clock, not on the spacing of arrivals: the
+headset sends bursts of ~12 samples every ~47 ms, so long pauses between
+arrivals are normal. The clock runs on the bundle time tags when the
+sender sets them, otherwise on arrival times. A lost packet leaves a
+deficit against the clock that stays; a late one leaves a deficit that
+goes away again once the next packets arrive on time. So a packet that
+starts behind the clock by more than the threshold,
+
+    gap_factor + jitter_factor * jitter     samples
+
+only opens a suspected gap. It is a loss if the next `confirm_packets`
+packets are all still behind by more than the threshold, of as many
+samples as the smallest of those deficits; it was lateness as soon as one
+of them is not. While a suspicion is open, `pending` is True and update()
+returns None; the update that settles it returns the number of samples
+lost in front of the suspect packet (0 when it was only late), so the
+caller can hold the suspect samples back and then interpolate
+(interpolate()) or flag the window.
+"""
+
+import threading
+from collections import deque
+import numpy as np
+
+GAP_MODES = (None, 'flag', 'interpolate')
+
+
+class StreamMonitor:
+    """Running statistics of one sample stream; update() is cheap enough for every sample"""
+
+    def __init__(self, fs, gap_factor=2.5, jitter_factor=4, confirm_packets=2, max_fill=8,
+                 history_secs=5):
+        self.fs = fs
+        self.gap_factor = gap_factor             # smallest deficit, in samples, that can be a gap
+        self.jitter_factor = jitter_factor
+        self.confirm_packets = confirm_packets   # packets a deficit must outlast to be a loss
+        self.max_fill = max_fill             # longest gap, in samples, worth interpolating
+        self._recent = deque(maxlen=int(history_secs * fs))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self.first = None
+            self.last = None
+            self.received = 0
+            self.gaps = 0
+            self.gap_samples = 0
+            self.max_gap = 0.0
+            self.late = 0
+            self.reorders = 0
+            self.filled = 0
+            self.flagged_windows = 0
+            self.jitter = 0.0
+            self._first_sent = None      # time tag of the first packet, when the sender sets them
+            self._offset = 0             # clock samples accounted for by losses and early packets
+            self._previous = 0           # deficit of the last packet judged
+            self._suspect = None         # deficits since a packet started behind the clock
+
+    @property
+    def threshold(self):
+        """Deficit, in samples, above which a packet opens a suspected gap"""
+        return self.gap_factor + self.jitter_factor * self.jitter
+
+    @property
+    def pending(self):
+        """A suspected gap waits for the next packet to be settled"""
+        return self._suspect is not None
+
+    def update(self, t, n=1, sent=None):
+        """Account for `n` samples that arrived at `t`, sent at time tag `sent`
+
+        Returns the samples lost in front of a suspect packet when this
+        update settles it, otherwise None.
+        """
+        with self._lock:
+            settled = None
+            if self.first is None:
+                self.first = t
+                self._first_sent = sent
+            elif t < self.last:
+                self.reorders += 1
+                self.received += n
+                return None
+            elif sent is not None or t - self.last > 0.5 / self.fs:
+                # First sample(s) of a new packet: how far behind the sample clock is it?
+                if self._first_sent is None:
+                    elapsed = t - self.first
+                else:
+                    elapsed = None if sent is None else sent - self._first_sent
+                if elapsed is not None:
+                    deficit = int(round(elapsed * self.fs)) - self.received - self._offset
+                    settled = self._judge(deficit, t - self.last)
+            self.last = t
+            self.received += n
+            self._recent.append((t, self.received))
+            return settled
+
+    def _judge(self, deficit, pause):
+        """Open, extend or settle a suspected gap with the deficit of a new packet"""
+        settled = None
+        threshold = self.threshold
+        if self._suspect is not None:
+            self._suspect.append(deficit)
+            if deficit <= threshold:
+                # Caught up: the suspect packets were only late
+                settled = 0
+                self.late += 1
+                for late in self._suspect:
+                    self._observe(late)
+                self._suspect = None
+                return settled
+            if len(self._suspect) <= self.confirm_packets:
+                return None
+            # Still behind: the samples never came
+            settled = min(self._suspect)
+            self.gaps += 1
+            self.gap_samples += settled
+            self._offset += settled
+            for behind in self._suspect:
+                self._observe(behind - settled)
+            self._suspect = None
+            return settled
+        if deficit > threshold:
+            self._suspect = [deficit]
+            self.max_gap = max(self.max_gap, pause)
+            return None
+        self._observe(deficit)
+        if deficit < 0:
+            # Ahead of the clock: packets came early or the headset
+            # clock runs fast; follow the earliest packets
+            self._offset += deficit
+            self._previous = 0
+        return settled
+
+    def _observe(self, deficit):
+        """Running jitter of the deficits that were lateness, as RFC 3550 keeps it"""
+        self.jitter += (abs(deficit - self._previous) - self.jitter) / 16
+        self._previous = deficit
+
+    def interpolate(self, previous, sample, missing):
+        """(missing, channels) samples on the line between `previous` and `sample`"""
+        self.filled += missing
+        weights = np.arange(1, missing + 1)[:, None] / (missing + 1)
+        previous = np.asarray(previous, dtype=np.float64)
+        return previous + weights * (np.asarray(sample, dtype=np.float64) - previous)
+
+    def stats(self):
+        with self._lock:
+            elapsed = (self.last - self.first) if self.received > 1 else 0.0
+            expected = int(round(elapsed * self.fs)) + 1 if self.received else 0
+            recent = list(self._recent)
+        effective_hz = 0.0
+        if len(recent) > 1 and recent[-1][0] > recent[0][0]:
+            effective_hz = (recent[-1][1] - recent[0][1]) / (recent[-1][0] - recent[0][0])
+        return {
+            'received': self.received,
+            'elapsed_s': elapsed,
+            'effective_hz': effective_hz,
+            'expected': expected,
+            'dropped_est': max(0, expected - self.received),
+            'gaps': self.gaps,
+            'gap_samples': self.gap_samples,
+            'max_gap_ms': self.max_gap * 1e3,
+            'late': self.late,
+            'jitter': self.jitter,
+            'reorders': self.reorders,
+            'filled': self.filled,
+            'flagged_windows': self.flagged_windows,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['effective_hz']:.1f} Hz, {s['received']} samples, ~{s['dropped_est']} dropped, "
+                f"{s['gaps']} gaps, {s['late']} late (max {s['max_gap_ms']:.0f} ms), {s['reorders']} reordered")
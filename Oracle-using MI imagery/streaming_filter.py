@@ -0,0 +1,85 @@
+"""
+streaming_filter.py - Causal band-pass/notch filtering that carries state across samples
+
+Filtering each prediction window on its own would add edge artifacts at both
+ends and filter the overlapping samples again for every window. Instead the
+samples are filtered once, as they arrive, with a cascade of second-order
+sections whose state is kept between calls.
+
+The same StreamingFilter runs offline over a whole recording (`filter_recording`),
+so training data goes through exactly the filter the live predictor applies.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+
+def design_sos(fs, band=(8, 30), notch=50, order=4, notch_q=30):
+    """Second-order sections for a Butterworth band-pass followed by a notch
+
+    `band` or `notch` may be None to leave that stage out.
+    """
+    sections = []
+    if band is not None:
+        sections.append(signal.butter(order, band, btype='bandpass', fs=fs, output='sos'))
+    if notch is not None:
+        b, a = signal.iirnotch(notch, notch_q, fs=fs)
+        sections.append(signal.tf2sos(b, a))
+    if not sections:
+        raise ValueError("At least one of band and notch must be given")
+    return np.vstack(sections)
+
+
+class StreamingFilter:
+    """Stateful causal SOS filter over (samples, channels) EEG"""
+
+    def __init__(self, fs, n_channels, band=(8, 30), notch=50, order=4, notch_q=30):
+        self.fs = fs
+        self.n_channels = n_channels
+        self.sos = design_sos(fs, band, notch, order, notch_q)
+        self._zi_unit = signal.sosfilt_zi(self.sos)           # (n_sections, 2)
+        self._zi = None
+
+    def reset(self):
+        """Forget the filter state; the next sample re-initialises it"""
+        self._zi = None
+
+    def process(self, samples):
+        """Filter a (n, channels) block and return the filtered block"""
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1, self.n_channels)
+        if self._zi is None:
+            # Start in steady state for the first sample to avoid a step transient
+            self._zi = self._zi_unit[:, :, np.newaxis] * samples[0]
+        filtered, self._zi = signal.sosfilt(self.sos, samples, axis=0, zi=self._zi)
+        return filtered
+
+    def process_sample(self, sample):
+        """Filter one sample of `n_channels` values"""
+        return self.process(sample)[0]
+
+
+def filter_recording(samples, fs=256, band=(8, 30), notch=50, order=4, notch_q=30):
+    """Filter a whole (samples, channels) recording the way the live stage does"""
+    samples = np.asarray(samples, dtype=np.float64)
+    stage = StreamingFilter(fs, samples.shape[1], band, notch, order, notch_q)
+    return stage.process(samples)
+
+
+def load_recording(path):
+    """Read a Recordings/MotorImagery CSV into a (samples, channels) DataFrame
+
+    Drops the row counter column, strips the RAW_ prefix and fills missing
+    values with the column mean, as the training notebook does.
+    """
+    df = pd.read_csv(path)
+    df = df.iloc[:, 1:]
+    df.columns = df.columns.str.replace('RAW_', "", n=1)
+    return df.fillna(df.mean())
+
+
+def filter_csv(path, fs=256, band=(8, 30), notch=50, order=4, notch_q=30):
+    """Load and filter one recording, keeping the channel names"""
+    df = load_recording(path)
+    filtered = filter_recording(df.to_numpy(), fs, band, notch, order, notch_q)
+    return pd.DataFrame(filtered, columns=df.columns)
@@ -0,0 +1,187 @@
+"""
+sweep_runner.py - Cross-validated hyperparameter sweep for EEG-ITNet
+
+Trains every combination of a parameter grid (n_ff, n_sf, drop_rate and the
+epoching window `duration` / `overlap`) under k-fold or leave-one-session-out
+cross-validation. Configurations run in a process pool, one per worker, and
+every worker is capped at `threads` TensorFlow/OpenMP threads so the pool
+does not oversubscribe the CPU. Each finished configuration is appended to a
+CSV with its mean/std accuracy, parameter count and measured single-window
+inference latency (KerasBackend, the path PeriodicPredictor uses). Latency is
+measured while other workers train, so compare it within a sweep only.
+
+    python sweep_runner.py ../Recordings/MotorImagery --grid grid.json --cv loso --workers 4
+
+grid.json maps parameter names to lists of values, e.g.
+
+    {"n_ff": [[2, 4, 8, 16], [4, 8, 16, 32]], "drop_rate": [0.2, 0.4], "overlap": [0.2, 0.5]}
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from timeit import default_timer as timer
+
+DEFAULTS = {
+    'n_ff': [2, 4, 8, 16],
+    'n_sf': [1, 1, 1, 1],
+    'drop_rate': 0.2,
+    'duration': 1,
+    'overlap': 0.2,
+}
+
+COLUMNS = ['config', 'cv', 'folds', 'acc_mean', 'acc_std', 'n_params', 'latency_ms', 'train_s']
+
+
+def expand_grid(grid):
+    """Every combination of the grid's values, filled up with DEFAULTS"""
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {sorted(unknown)}, expected {sorted(DEFAULTS)}")
+    keys = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        config = dict(DEFAULTS)
+        config.update(zip(keys, values))
+        configs.append(config)
+    return configs
+
+
+def cv_folds(y, sessions, cv='kfold', k=5, seed=0):
+    """[(train_idx, val_idx)] for k-fold over epochs or leave-one-session-out"""
+    if cv == 'loso':
+        unique = np.unique(sessions)
+        if len(unique) < 2:
+            raise ValueError("Leave-one-session-out needs recordings from at least two sessions")
+        return [(np.flatnonzero(sessions != s), np.flatnonzero(sessions == s)) for s in unique]
+    if cv == 'kfold':
+        order = np.random.default_rng(seed).permutation(len(y))
+        parts = np.array_split(order, k)
+        return [(np.concatenate(parts[:i] + parts[i + 1:]), parts[i]) for i in range(k)]
+    raise ValueError(f"Unknown cross-validation '{cv}', expected 'kfold' or 'loso'")
+
+
+def _limit_threads(threads):
+    """Pool initializer: cap every thread pool before TensorFlow is imported"""
+    for var in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+
+def run_config(config, x_path, y, sessions, cv, k, epochs, batch_size, seed):
+    """Cross-validate one configuration; runs inside a pool worker"""
+    import tensorflow as tf
+    from eeg_itnet import Network
+    from train import train
+    from inference_backend import KerasBackend
+
+    x = np.load(x_path, mmap_mode='r')
+    n_channels, n_samples = x.shape[1], x.shape[2]
+    accuracies = []
+    start = timer()
+    for train_idx, val_idx in cv_folds(y, sessions, cv, k, seed):
+        tf.keras.backend.clear_session()
+        tf.keras.utils.set_random_seed(seed)
+        train_idx, val_idx = np.sort(train_idx), np.sort(val_idx)
+        model = Network(n_channels, n_samples, n_ff=config['n_ff'], n_sf=config['n_sf'],
+                        drop_rate=config['drop_rate'])
+        history = train(model, x[train_idx][..., np.newaxis], y[train_idx],
+                        x[val_idx][..., np.newaxis], y[val_idx],
+                        epochs=epochs, batch_size=batch_size, seed=seed, verbose=False)
+        accuracies.append(history['val_acc'][-1])
+    train_s = timer() - start
+
+    # Latency of the last fold's model through the deployed inference path
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.h5')
+        model.save(path)
+        backend = KerasBackend(path, n_channels, n_samples, warmup_runs=100, verify=False)
+
+    return {
+        'config': json.dumps(config),
+        'cv': cv,
+        'folds': len(accuracies),
+        'acc_mean': float(np.mean(accuracies)),
+        'acc_std': float(np.std(accuracies)),
+        'n_params': model.count_params(),
+        'latency_ms': backend.latency['warm_ms'],
+        'train_s': train_s,
+    }
+
+
+def sweep(recordings, configs, cv='kfold', k=5, epochs=20, batch_size=32, workers=None,
+          threads=1, cache_dir=None, out='sweep_results.csv', seed=0):
+    """Run every configuration and append its row to `out`; returns the rows"""
+    from dataset_builder import build_dataset
+
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'eeg_sweep_cache')
+
+    # Epoch once per window setting in this process; workers only memory-map the cache
+    datasets = {}
+    for config in configs:
+        key = (config['duration'], config['overlap'])
+        if key not in datasets:
+            x, y, sessions = build_dataset(recordings, duration=config['duration'],
+                                           overlap=config['overlap'], cache_dir=cache_dir)
+            datasets[key] = (x.filename, y, sessions)
+
+    write_header = not os.path.exists(out)
+    rows = []
+    with open(out, 'a', newline='') as f, \
+            ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                initializer=_limit_threads, initargs=(threads,)) as pool:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if write_header:
+            writer.writeheader()
+        futures = {
+            pool.submit(run_config, config, *datasets[(config['duration'], config['overlap'])],
+                        cv, k, epochs, batch_size, seed): config
+            for config in configs
+        }
+        for future in as_completed(futures):
+            row = future.result()
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            print(f"acc {row['acc_mean']:.3f} ± {row['acc_std']:.3f}  params {row['n_params']:6d}  "
+                  f"latency {row['latency_ms']:.2f} ms  {row['config']}")
+    return sorted(rows, key=lambda r: r['acc_mean'], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('recordings', help='directory of Left/Right recording CSVs')
+    parser.add_argument('--grid', help='JSON file mapping parameters to lists of values')
+    parser.add_argument('--cv', default='kfold', choices=['kfold', 'loso'])
+    parser.add_argument('--folds', type=int, default=5, help='k for k-fold')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=None, help='default: cores / threads')
+    parser.add_argument('--threads', type=int, default=1, help='TensorFlow threads per worker')
+    parser.add_argument('--cache', default=None, help='dataset cache directory')
+    parser.add_argument('--out', default='sweep_results.csv')
+    args = parser.parse_args(argv)
+
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    configs = expand_grid(grid)
+    print(f"{len(configs)} configuration(s), {args.cv} cross-validation")
+    rows = sweep(args.recordings, configs, args.cv, args.folds, args.epochs, args.batch_size,
+                 args.workers, args.threads, args.cache, args.out)
+    print(f"Best: acc {rows[0]['acc_mean']:.3f}  {rows[0]['config']}")
+    print(f"Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,84 @@
+"""
+test_stream_monitor.py - Gap detection on jittered streams (python -m pytest)
+
+The streams are synthetic Muse packets of 12 samples every 12/256 s, each
+arriving up to a few tens of ms late independently of the others.
+"""
+
+import numpy as np
+import pytest
+import periodic_predictor
+from periodic_predictor import PeriodicPredictor
+from stream_monitor import StreamMonitor
+
+FS = 256
+PACKET = 12
+
+
+def _arrivals(n_packets, jitter, seed=0):
+    """Send time and arrival time of every packet, arrivals in order as UDP hands them over"""
+    rng = np.random.default_rng(seed)
+    sent = np.arange(n_packets) * PACKET / FS
+    arrived = np.maximum.accumulate(sent + np.abs(rng.normal(0, jitter, n_packets)))
+    return sent, arrived
+
+
+def _feed(monitor, arrived, lost=(), sent=None):
+    for k, t in enumerate(arrived):
+        if k in lost:
+            continue
+        if sent is not None:
+            monitor.update(t, PACKET, sent[k])
+        else:
+            for _ in range(PACKET):
+                monitor.update(t)
+
+
+@pytest.mark.parametrize('jitter', [0.004, 0.010, 0.015, 0.030])
+def test_jitter_without_loss_has_no_gaps(jitter):
+    monitor = StreamMonitor(FS)
+    _, arrived = _arrivals(2560, jitter)
+    _feed(monitor, arrived)
+    assert monitor.gaps == 0
+    assert monitor.gap_samples == 0
+    assert not monitor.pending
+
+
+@pytest.mark.parametrize('jitter', [0.0, 0.004, 0.015])
+def test_lost_packets_are_gaps(jitter):
+    monitor = StreamMonitor(FS)
+    _, arrived = _arrivals(2560, jitter)
+    _feed(monitor, arrived, lost={100, 1000, 1001})
+    assert monitor.gaps == 2
+    assert 3 * PACKET <= monitor.gap_samples <= 3 * PACKET + 6
+
+
+def test_time_tags_count_lost_samples_exactly():
+    monitor = StreamMonitor(FS)
+    sent, arrived = _arrivals(2560, 0.030)
+    _feed(monitor, arrived, lost={100, 1000, 1001}, sent=sent)
+    assert monitor.gaps == 2
+    assert monitor.gap_samples == 3 * PACKET
+
+
+@pytest.mark.parametrize('gap_mode', ['interpolate', 'flag'])
+def test_predictor_publishes_every_window_of_jittered_stream(monkeypatch, gap_mode):
+    clock = [0.0]
+    monkeypatch.setattr(periodic_predictor, 'timer', lambda: clock[0])
+    predictor = PeriodicPredictor(gap_mode=gap_mode)
+    try:
+        predictor.marker_handler('/Marker/1')
+        _, arrived = _arrivals(1280, 0.015)
+        samples = np.random.default_rng(1).normal(800, 20, (len(arrived) * PACKET, 4))
+        for k, t in enumerate(arrived):
+            clock[0] = t
+            predictor.eeg_block_handler('/muse/eeg', samples[k * PACKET:(k + 1) * PACKET])
+        stats = predictor.get_stream_stats()
+        assert stats['gaps'] == 0
+        assert stats['filled'] == 0
+        assert stats['flagged_windows'] == 0
+        # 256 sample windows, keeping 230 of them as overlap
+        assert predictor.window_ring.write_seq == (len(samples) - 256) // 26 + 1
+    finally:
+        predictor.scheduler.close()
+        predictor.window_ring.close()
@@ -0,0 +1,42 @@
+"""
+text_cache.py - Cached fonts and rendered text for the pygame UI
+
+pygame.font.SysFont looks the font up on the system every time it is called,
+and the carousel writes every caption and label again whenever it redraws.
+TextCache keeps one Font per size and an LRU of rendered surfaces keyed by
+(text, colour, size), so a label that is already on screen costs a dict
+lookup and a blit however many there are.
+"""
+
+from collections import OrderedDict
+import pygame
+
+
+class TextCache:
+    """Fonts by size and the last `max_surfaces` rendered texts"""
+
+    def __init__(self, font_name=None, max_surfaces=256, antialias=True):
+        self.font_name = font_name
+        self.max_surfaces = max_surfaces
+        self.antialias = antialias
+        self._fonts = {}
+        self._surfaces = OrderedDict()
+
+    def font(self, size):
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.SysFont(self.font_name, size)
+        return font
+
+    def render(self, text, color, size):
+        """Rendered surface of `text`; shared, so do not draw on it"""
+        key = (text, tuple(color), size)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        surface = self.font(size).render(text, self.antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_surfaces:
+            self._surfaces.popitem(last=False)
+        return surface
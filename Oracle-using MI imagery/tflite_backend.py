@@ -0,0 +1,169 @@
+"""
+tflite_backend.py - Quantized TFLite export and interpreter backend for EEG-ITNet
+
+Importing and running full TensorFlow is heavy on the CPU-only laptops that
+drive the headsets. `export_tflite` converts the trained model.h5 into a
+float16 and an int8 TFLite model, calibrating the int8 ranges on windows
+taken from the recordings. TFLiteBackend then runs either file through the
+lightweight interpreter with the same interface as KerasBackend, and
+`compare_backends` reports accuracy and latency of every variant on the
+test split.
+
+The interpreter comes from tflite_runtime or ai_edge_litert when one of them
+is installed; full TensorFlow is only the fallback.
+"""
+
+import os
+import numpy as np
+from timeit import default_timer as timer
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        Interpreter = None
+
+
+def _interpreter_class():
+    if Interpreter is not None:
+        return Interpreter
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def export_tflite(model_path, out_dir, calibration_windows, max_calibration=500):
+    """Write model_fp16.tflite and model_int8.tflite next to each other
+
+    `calibration_windows` is a (n, channels, samples, 1) array of preprocessed
+    recording windows used to calibrate the int8 activation ranges. Inputs and
+    outputs stay float32 so both files are drop-in replacements.
+    Returns {'float16': path, 'int8': path}.
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    paths['float16'] = os.path.join(out_dir, 'model_fp16.tflite')
+    with open(paths['float16'], 'wb') as f:
+        f.write(converter.convert())
+
+    calibration = np.asarray(calibration_windows, dtype=np.float32)
+    rng = np.random.default_rng(0)
+    if len(calibration) > max_calibration:
+        calibration = calibration[rng.choice(len(calibration), max_calibration, replace=False)]
+
+    def representative_dataset():
+        for window in calibration:
+            yield [window[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    paths['int8'] = os.path.join(out_dir, 'model_int8.tflite')
+    with open(paths['int8'], 'wb') as f:
+        f.write(converter.convert())
+
+    for kind, path in paths.items():
+        print(f"Exported {kind} model to {path} ({os.path.getsize(path) / 1024:.1f} KiB)")
+    return paths
+
+
+class TFLiteBackend:
+    """Runs an exported .tflite model with the TFLite interpreter"""
+
+    name = 'tflite'
+
+    def __init__(self, model_path, n_channels=4, n_samples=256, warmup_runs=10, num_threads=None):
+        self.model_path = model_path
+        self.input_shape = (n_channels, n_samples, 1)
+        self.interpreter = _interpreter_class()(model_path=model_path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]['index']
+        self._output = self.interpreter.get_output_details()[0]['index']
+        self._batch = None
+
+        self.latency = self._warm_up(warmup_runs)
+        print("Inference backend '{}': cold {:.1f} ms, warm {:.2f} ms".format(
+            self.name, self.latency['cold_ms'], self.latency['warm_ms']))
+
+    def _warm_up(self, runs):
+        x = np.zeros((1,) + self.input_shape, dtype=np.float32)
+        t = timer()
+        self.predict(x)
+        cold = timer() - t
+
+        warm = []
+        for _ in range(max(1, runs)):
+            t = timer()
+            self.predict(x)
+            warm.append(timer() - t)
+        return {'cold_ms': cold * 1e3, 'warm_ms': float(np.median(warm)) * 1e3}
+
+    def _resize(self, batch):
+        # Tensors are reallocated only when the batch size changes
+        self.interpreter.resize_tensor_input(self._input, (batch,) + self.input_shape)
+        self.interpreter.allocate_tensors()
+        self._batch = batch
+
+    def predict(self, x):
+        """Class probabilities for a (batch, channels, samples, 1) array"""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.shape[0] != self._batch:
+            self._resize(x.shape[0])
+        self.interpreter.set_tensor(self._input, x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output).copy()
+
+
+def compare_backends(keras_model_path, tflite_paths, x_test, y_test, latency_runs=100):
+    """Accuracy and single-window latency of the Keras model and its TFLite exports
+
+    Prints a table and returns one dict per backend. `agreement` is the share
+    of test windows where the backend predicts the same class as Keras.
+    """
+    from inference_backend import KerasBackend
+
+    n_channels, n_samples = x_test.shape[1:3]
+    backends = {'keras': KerasBackend(keras_model_path, n_channels, n_samples, verify=False)}
+    for kind, path in tflite_paths.items():
+        backends['tflite-' + kind] = TFLiteBackend(path, n_channels, n_samples)
+
+    x_test = np.asarray(x_test, dtype=np.float32)
+    y_test = np.asarray(y_test)
+    reference = None
+    report = []
+    for name, backend in backends.items():
+        predicted = np.argmax(backend.predict(x_test), axis=-1)
+        if reference is None:
+            reference = predicted
+
+        times = []
+        for i in range(latency_runs):
+            window = x_test[i % len(x_test)][np.newaxis]
+            t = timer()
+            backend.predict(window)
+            times.append(timer() - t)
+        times = np.array(times) * 1e3
+
+        report.append({
+            'backend': name,
+            'accuracy': float(np.mean(predicted == y_test)),
+            'agreement': float(np.mean(predicted == reference)),
+            'latency_p50_ms': float(np.percentile(times, 50)),
+            'latency_p95_ms': float(np.percentile(times, 95)),
+            'size_kib': os.path.getsize(backend.model_path) / 1024,
+        })
+
+    print('{:<16}{:>10}{:>11}{:>10}{:>10}{:>11}'.format(
+        'backend', 'accuracy', 'agreement', 'p50 ms', 'p95 ms', 'size KiB'))
+    for row in report:
+        print('{backend:<16}{accuracy:>10.3f}{agreement:>11.3f}{latency_p50_ms:>10.2f}'
+              '{latency_p95_ms:>10.2f}{size_kib:>11.1f}'.format(**row))
+    return report
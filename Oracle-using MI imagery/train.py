@@ -0,0 +1,137 @@
+"""
+train.py - Graph-compiled EEG-ITNet training on a tf.data pipeline
+
+The notebook trains with an eager GradientTape step per batch, pulls batches
+through a Python Sequence and scores every batch with sklearn on host arrays,
+which syncs the device and round-trips through NumPy each step. Here the
+train and validation steps are tf.functions, accuracy and loss are Keras
+metrics that stay on the device until the end of the epoch, and batches come
+from a shuffled, prefetched tf.data pipeline. Every epoch reports its wall
+time.
+
+    python train.py ../Recordings/MotorImagery --epochs 20 --out model.h5
+"""
+
+import argparse
+import numpy as np
+import tensorflow as tf
+from timeit import default_timer as timer
+from eeg_itnet import Network
+
+
+def make_dataset(x, y, batch_size=32, shuffle=True, seed=None):
+    """Batched (x, y) pipeline; training batches are shuffled every epoch and equal-sized"""
+    ds = tf.data.Dataset.from_tensor_slices((np.asarray(x, dtype=np.float32),
+                                             np.asarray(y, dtype=np.float32)))
+    if shuffle:
+        ds = ds.shuffle(len(x), seed=seed, reshuffle_each_iteration=True)
+    # Like the notebook's DataLoader, training drops the last partial batch,
+    # which also keeps a single traced shape for the train step
+    ds = ds.batch(batch_size, drop_remainder=shuffle)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def train(model, x_train, y_train, x_val=None, y_val=None, epochs=20, batch_size=32,
+          optimizer=None, loss=None, jit_compile=False, seed=None, verbose=True):
+    """Train `model` in place; returns the per-epoch history
+
+    x_train may also be a batched tf.data.Dataset of (x, y), e.g.
+    SlidingWindowSource.as_dataset(), in which case y_train is ignored.
+    history has 'loss', 'acc', 'val_loss', 'val_acc' and 'epoch_s' lists.
+    """
+    optimizer = optimizer or tf.keras.optimizers.Adam(learning_rate=0.001)
+    ce_loss = loss or tf.keras.losses.SparseCategoricalCrossentropy(from_logits=False)
+
+    if isinstance(x_train, tf.data.Dataset):
+        train_ds = x_train
+    else:
+        train_ds = make_dataset(x_train, y_train, batch_size, shuffle=True, seed=seed)
+    val_ds = make_dataset(x_val, y_val, batch_size, shuffle=False) if x_val is not None else None
+
+    loss_avg = tf.keras.metrics.Mean()
+    acc_avg = tf.keras.metrics.SparseCategoricalAccuracy()
+    val_loss_avg = tf.keras.metrics.Mean()
+    val_acc_avg = tf.keras.metrics.SparseCategoricalAccuracy()
+
+    @tf.function(jit_compile=jit_compile)
+    def train_step(x, y):
+        with tf.GradientTape() as tape:
+            y_ = model(x, training=True)
+            batch_loss = ce_loss(y_true=y, y_pred=y_)
+        grad = tape.gradient(batch_loss, model.trainable_variables)
+        optimizer.apply_gradients(zip(grad, model.trainable_variables))
+        loss_avg.update_state(batch_loss)
+        acc_avg.update_state(y, y_)
+
+    @tf.function(jit_compile=jit_compile)
+    def val_step(x, y):
+        y_ = model(x, training=False)
+        val_loss_avg.update_state(ce_loss(y_true=y, y_pred=y_), sample_weight=tf.shape(y)[0])
+        val_acc_avg.update_state(y, y_)
+
+    history = {'loss': [], 'acc': [], 'val_loss': [], 'val_acc': [], 'epoch_s': []}
+    for epoch in range(epochs):
+        start = timer()
+        for metric in (loss_avg, acc_avg, val_loss_avg, val_acc_avg):
+            metric.reset_state()
+        for x, y in train_ds:
+            train_step(x, y)
+        if val_ds is not None:
+            for x, y in val_ds:
+                val_step(x, y)
+
+        # The only host sync of the epoch
+        history['loss'].append(float(loss_avg.result()))
+        history['acc'].append(float(acc_avg.result()))
+        history['val_loss'].append(float(val_loss_avg.result()) if val_ds is not None else None)
+        history['val_acc'].append(float(val_acc_avg.result()) if val_ds is not None else None)
+        history['epoch_s'].append(timer() - start)
+
+        if verbose:
+            line = (f"Epoch {epoch:3d}  {history['epoch_s'][-1]:6.2f} s  "
+                    f"loss {history['loss'][-1]:.3f}  acc {history['acc'][-1]:.3f}")
+            if val_ds is not None:
+                line += f"  val_loss {history['val_loss'][-1]:.3f}  val_acc {history['val_acc'][-1]:.3f}"
+            print(line)
+    return history
+
+
+def split_per_class(x, y, split=64):
+    """The notebook's split: the first `split` epochs of every class are the validation set"""
+    train_idx, val_idx = [], []
+    for label in np.unique(y):
+        idx = np.flatnonzero(y == label)
+        val_idx.append(idx[:split])
+        train_idx.append(idx[split:])
+    train_idx, val_idx = np.concatenate(train_idx), np.concatenate(val_idx)
+    return x[train_idx], y[train_idx], x[val_idx], y[val_idx]
+
+
+def main(argv=None):
+    from dataset_builder import build_dataset
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('recordings', help='directory of Left/Right recording CSVs')
+    parser.add_argument('--cache', default=None, help='dataset cache directory')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--val-split', type=int, default=64, help='validation epochs per class')
+    parser.add_argument('--jit', action='store_true', help='compile the steps with XLA')
+    parser.add_argument('--out', default='model.h5')
+    args = parser.parse_args(argv)
+
+    x, y, _ = build_dataset(args.recordings, cache_dir=args.cache)
+    x = np.asarray(x)[:, :, :, np.newaxis]
+    x_train, y_train, x_val, y_val = split_per_class(x, y, args.val_split)
+
+    model = Network(Chans=x.shape[1], Samples=x.shape[2])
+    history = train(model, x_train, y_train, x_val, y_val, epochs=args.epochs,
+                    batch_size=args.batch_size, jit_compile=args.jit)
+    print(f"Mean epoch time {np.mean(history['epoch_s'][1:] or history['epoch_s']):.2f} s "
+          f"(first epoch {history['epoch_s'][0]:.2f} s, includes tracing)")
+    model.save(args.out)
+    print(f"Model saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
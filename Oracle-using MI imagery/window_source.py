@@ -0,0 +1,112 @@
+"""
+window_source.py - Every training window of the recordings, at any stride, without copies
+
+The notebook epochs with a fixed 20% overlap, which on a 20 s recording
+keeps 24 of the ~5000 possible one-second windows. SlidingWindowSource keeps
+each recording once, average-referenced and contiguous, and describes every
+window by its start sample; windows() exposes them as strided views. Only
+the batches handed to training are materialized, gathered with a single
+fancy index, and augmented on the fly:
+
+    scale   per-window amplitude factor in [1 - scale, 1 + scale]
+    shift   per-window time shift of up to +-shift samples, within the recording
+    noise   Gaussian channel noise, `noise` times each window's channel std
+
+    source = SlidingWindowSource.from_files('Recordings/MotorImagery', stride=16)
+    history = train(model, source.as_dataset(32, augment=True), None, x_val, y_val)
+"""
+
+import numpy as np
+from preprocessing import average_reference
+
+
+class SlidingWindowSource:
+    """Windows of `duration` seconds every `stride` samples over continuous recordings"""
+
+    def __init__(self, recordings, labels, fs=256, duration=1, stride=32,
+                 scale=0.1, shift=8, noise=0.05, seed=None):
+        self.fs = fs
+        self.window = int(round(fs * duration))
+        self.stride = int(stride)
+        self.scale, self.shift, self.noise = scale, shift, noise
+        self.rng = np.random.default_rng(seed)
+
+        # All recordings side by side in one (channels, samples) array; windows
+        # never cross a boundary because their starts are computed per recording
+        parts = [average_reference(np.asarray(r).T).astype(np.float32) for r in recordings]
+        parts = [p for p in parts if p.shape[1] >= self.window]
+        self.data = np.concatenate(parts, axis=1)
+        self.bounds = bounds = np.cumsum([0] + [p.shape[1] for p in parts])
+
+        starts, first, last, y, rec = [], [], [], [], []
+        for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            s = np.arange(lo, hi - self.window + 1, self.stride)
+            starts.append(s)
+            first.append(np.full(len(s), lo))
+            last.append(np.full(len(s), hi - self.window))
+            y.append(np.full(len(s), labels[i], dtype=np.float32))
+            rec.append(np.full(len(s), i))
+        self.starts = np.concatenate(starts)
+        self._first = np.concatenate(first)      # earliest and latest start allowed
+        self._last = np.concatenate(last)        # for each window when shifting
+        self.y = np.concatenate(y)
+        self.recording = np.concatenate(rec)
+
+    @classmethod
+    def from_files(cls, source, labels=('Left', 'Right'), fs=256, duration=1, stride=32, **kwargs):
+        """Load Left/Right recording CSVs (directory, glob or list) with dataset_builder's rules"""
+        from dataset_builder import find_files, label_of
+        from streaming_filter import load_recording
+
+        labels = list(labels)
+        paths = find_files(source, labels)
+        recordings = [load_recording(p).to_numpy() for p in paths]
+        source = cls(recordings, [labels.index(label_of(p)) for p in paths], fs, duration, stride, **kwargs)
+        source.paths = paths
+        return source
+
+    def __len__(self):
+        return len(self.starts)
+
+    def windows(self, recording):
+        """(n_windows, channels, window) strided view of one recording's windows"""
+        lo, hi = self.bounds[recording], self.bounds[recording + 1]
+        views = np.lib.stride_tricks.sliding_window_view(self.data[:, lo:hi], self.window, axis=-1)
+        return views[:, ::self.stride].transpose(1, 0, 2)
+
+    def batch(self, indices, augment=False):
+        """(len(indices), channels, window, 1) float32 model input and labels"""
+        starts = self.starts[indices]
+        if augment and self.shift:
+            offsets = self.rng.integers(-self.shift, self.shift + 1, size=len(starts))
+            starts = np.clip(starts + offsets, self._first[indices], self._last[indices])
+        x = self.data[:, starts[:, None] + np.arange(self.window)]      # (channels, batch, window)
+        x = x.transpose(1, 0, 2)
+        if augment:
+            if self.scale:
+                x = x * self.rng.uniform(1 - self.scale, 1 + self.scale, size=(len(x), 1, 1)).astype(np.float32)
+            if self.noise:
+                std = x.std(axis=-1, keepdims=True)
+                x = x + self.noise * std * self.rng.standard_normal(x.shape, dtype=np.float32)
+        return np.ascontiguousarray(x[..., np.newaxis]), self.y[indices]
+
+    def batches(self, batch_size=32, shuffle=True, augment=True, indices=None):
+        """One epoch of (x, y) batches; with shuffle the last partial batch is dropped"""
+        order = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if shuffle:
+            order = self.rng.permutation(order)
+            n = len(order) - len(order) % batch_size
+        else:
+            n = len(order)
+        for i in range(0, n, batch_size):
+            yield self.batch(order[i:i + batch_size], augment)
+
+    def as_dataset(self, batch_size=32, shuffle=True, augment=True, indices=None):
+        """tf.data pipeline over batches(), reshuffled and re-augmented every epoch"""
+        import tensorflow as tf
+
+        signature = (tf.TensorSpec((None, self.data.shape[0], self.window, 1), tf.float32),
+                     tf.TensorSpec((None,), tf.float32))
+        ds = tf.data.Dataset.from_generator(
+            lambda: self.batches(batch_size, shuffle, augment, indices), output_signature=signature)
+        return ds.prefetch(tf.data.AUTOTUNE)